@@ -0,0 +1,127 @@
+from multiprocessing import Pool
+import argparse
+import json
+import os
+import sys
+import time
+from src.levels import LevelPack, load_level
+from src.solver import solve_field, SearchExhausted, CLI_MAX_NODES
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SOLVED, UNSOLVABLE, EXHAUSTED = 'solved', 'unsolvable', 'exhausted'
+FINAL = (SOLVED, UNSOLVABLE)
+RSS_SCALE = 1024 if sys.platform == 'darwin' else 1
+
+_packs = {}
+
+
+def _load(path: str, key):
+    if os.path.isdir(path):
+        return load_level(os.path.join(path, key))
+
+    if path not in _packs:
+        _packs[path] = LevelPack(path)
+
+    return _packs[path].load(key)
+
+
+def _tasks(path: str):
+    if os.path.isdir(path):
+        return [(path, name) for name in sorted(os.listdir(path)) if name.endswith('.pzl')]
+
+    pack = LevelPack(path)
+    count = len(pack)
+    pack.close()
+
+    return [(path, index) for index in range(count)]
+
+
+def analyze(task):
+    path, key, max_nodes, weight = task
+    started = time.perf_counter()
+    level = _load(path, key)
+    field = level.create_field()
+    report = {'source': path, 'level': key, 'status': None, 'max_nodes': max_nodes, 'weight': weight,
+              'optimal': False, 'moves': None, 'lower_bound': None, 'actions': None, 'expanded': None,
+              'wall_time': 0.0, 'worker': os.getpid(), 'worker_peak_memory_kb': None}
+
+    try:
+        solution = solve_field(field, level.get_selection(), max_nodes, weight)
+    except SearchExhausted as error:
+        report['status'] = EXHAUSTED
+        report['lower_bound'] = error.get_lower_bound()
+        report['expanded'] = error.get_expanded()
+    else:
+        report['status'] = UNSOLVABLE if solution is None else SOLVED
+
+        if solution is not None:
+            report['optimal'] = solution.is_optimal()
+            report['moves'] = solution.get_move_count()
+            report['actions'] = solution.get_cost()
+            report['expanded'] = solution.get_expanded()
+
+    if resource is not None:
+        report['worker_peak_memory_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // RSS_SCALE
+
+    report['wall_time'] = time.perf_counter() - started
+
+    return report
+
+
+def _finished(report_path: str):
+    done = set()
+    if not os.path.exists(report_path):
+        return done
+
+    with open(report_path) as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+
+            if entry.get('status') in FINAL:
+                done.add((entry['source'], entry['level']))
+
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve levels headlessly and write a report per level')
+    parser.add_argument('sources', nargs='+', help='level packs or directories of .pzl files')
+    parser.add_argument('--report', default='analysis.jsonl')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-nodes', type=int, default=CLI_MAX_NODES, help='0 searches without a budget')
+    parser.add_argument('--weight', type=float, default=1)
+    parser.add_argument('--tasks-per-worker', type=int, default=1,
+                        help='levels solved by a worker process before it is replaced, 1 gives per-level peak memory')
+    parser.add_argument('--restart', action='store_true', help='ignore reports from an earlier run')
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.report):
+        os.remove(args.report)
+
+    done = _finished(args.report)
+    tasks = [(path, key, args.max_nodes or None, args.weight)
+             for source in args.sources for path, key in _tasks(source) if (path, key) not in done]
+
+    print('%s levels to analyze, %s already reported' % (len(tasks), len(done)))
+    started = time.perf_counter()
+    counts = {SOLVED: 0, UNSOLVABLE: 0, EXHAUSTED: 0}
+
+    with open(args.report, 'a') as output, Pool(args.workers, maxtasksperchild=args.tasks_per_worker) as pool:
+        for report in pool.imap_unordered(analyze, tasks):
+            output.write(json.dumps(report) + '\n')
+            output.flush()
+            counts[report['status']] += 1
+
+    print('Analyzed %s levels (%s solved, %s unsolvable, %s over the node budget) in %.2fs' % (
+        len(tasks), counts[SOLVED], counts[UNSOLVABLE], counts[EXHAUSTED], time.perf_counter() - started))
+
+
+if __name__ == '__main__':
+    main()
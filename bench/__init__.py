@@ -0,0 +1,59 @@
+from time import perf_counter
+import platform
+import sys
+
+
+CALIBRATION_NUMBER = 200
+
+
+def _calibration():
+    values = {}
+    for i in range(512):
+        values[i & 63] = values.get(i & 63, 0) + i * i
+
+    return sorted(values.items())
+
+
+def _time(run, number: int):
+    started = perf_counter()
+    for _ in range(number):
+        run()
+
+    return (perf_counter() - started) / number
+
+
+def measure(run, number: int, repeat=7):
+    samples, ratios = [], []
+
+    for _ in range(repeat):
+        reference = _time(_calibration, CALIBRATION_NUMBER)
+        samples.append(_time(run, number))
+        ratios.append(reference / samples[-1] if samples[-1] > 0 else 0.0)
+
+    samples.sort()
+    ratios.sort()
+
+    return {'number': number, 'repeat': repeat, 'ops_per_second': 1 / samples[0] if samples[0] > 0 else 0.0,
+            'best_us': samples[0] * 1e6, 'median_us': samples[len(samples) // 2] * 1e6, 'worst_us': samples[-1] * 1e6,
+            'relative': ratios[len(ratios) // 2]}
+
+
+def environment():
+    return {'python': sys.version.split()[0], 'implementation': platform.python_implementation(),
+            'machine': platform.machine()}
+
+
+def compare(results: dict, baseline: dict, tolerance=0.25):
+    regressions = []
+
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None or not reference.get('relative'):
+            continue
+
+        ratio = result['relative'] / reference['relative']
+        if ratio < 1 - tolerance:
+            regressions.append({'name': name, 'ratio': ratio, 'relative': result['relative'],
+                                'baseline': reference['relative']})
+
+    return regressions
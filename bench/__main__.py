@@ -0,0 +1,40 @@
+import argparse
+import json
+import sys
+from bench import environment, compare
+import bench.logic
+import bench.render
+
+SUITES = {'logic': bench.logic.run, 'render': bench.render.run}
+
+parser = argparse.ArgumentParser(description='Run logic and rendering benchmarks without a display')
+parser.add_argument('suites', nargs='*', default=list(SUITES))
+parser.add_argument('--output', default=None)
+parser.add_argument('--baseline', default=None,
+                    help='report written by --output; results are compared relative to the interleaved calibration loop')
+parser.add_argument('--tolerance', type=float, default=0.25)
+args = parser.parse_args()
+
+results = {}
+for suite in args.suites:
+    results.update(SUITES[suite]())
+
+report = {'environment': environment(), 'results': results}
+
+if args.baseline is not None:
+    with open(args.baseline) as file:
+        report['regressions'] = compare(results, json.load(file)['results'], args.tolerance)
+
+if args.output is not None:
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+
+for name, result in sorted(results.items()):
+    print('%-28s %12.0f ops/s %10.2f us %10.4f x' % (name, result['ops_per_second'], result['best_us'],
+                                                   result['relative']))
+
+for regression in report.get('regressions', []):
+    print('REGRESSION %s: %.4f x calibration vs baseline %.4f (%.0f%%)' % (
+        regression['name'], regression['relative'], regression['baseline'], regression['ratio'] * 100))
+
+sys.exit(1 if report.get('regressions') else 0)
@@ -0,0 +1,70 @@
+from random import Random
+from src.core import Field, Puzzle, Selection, Controller, EMPTY, KINDS, KEY_DIRECTIONS, LATENCY_SAMPLES
+from src.profiler import Histogram
+from src.bitboard import BitboardField
+from src.levels import Level
+from bench import measure
+
+
+def _cells(field, count: int, seed=0):
+    rnd = Random(seed)
+    return [(rnd.randrange(1, field.get_width() - 1), rnd.randrange(1, field.get_size() - 1)) for _ in range(count)]
+
+
+def bench_field(field_type, name: str):
+    level = Level.default()
+    field = level.create_field(field_type)
+    cells = _cells(field, 1024)
+    kinds = [EMPTY] + KINDS
+    state = {'index': 0}
+
+    def update_field():
+        i = state['index'] = (state['index'] + 1) & 1023
+        col, row = cells[i]
+        field.update_field(col, row, kinds[i & 3])
+
+    def is_blocked():
+        i = state['index'] = (state['index'] + 1) & 1023
+        field.is_blocked(*cells[i])
+
+    return {
+        name + '.update_field': measure(update_field, 20000),
+        name + '.is_blocked': measure(is_blocked, 50000),
+        name + '.check_vertical_lines': measure(field.check_vertical_lines, 50000),
+    }
+
+
+def bench_input(burst=4, step=1 / 120):
+    level = Level.default()
+    field = level.create_field()
+    state = {'tick': 0, 'time': 0.0}
+    controller = Controller(Puzzle(field, selection=Selection(*level.get_selection(), Puzzle.get_bounds(field))),
+                            latency=Histogram(LATENCY_SAMPLES), clock=lambda: state['time'])
+    symbols = [symbol for symbol, _ in KEY_DIRECTIONS]
+
+    def tick():
+        i = state['tick'] = state['tick'] + 1
+        if i % 240 == 0:
+            for j in range(burst):
+                symbol = symbols[(i // 240 + j) & 3]
+                controller.on_key_press(symbol, state['time'] - j * step / burst)
+                controller.on_key_release(symbol, state['time'] - j * step / burst)
+
+        state['time'] += step
+        controller.update(step)
+
+    result = measure(tick, 20000)
+    result['latency_ms'] = {name: value * 1e3 if name != 'count' else value
+                            for name, value in controller.get_latency().get_stats().items()}
+    result['pending'] = controller.get_pending()
+
+    return {'controller.update': result}
+
+
+def run():
+    results = {}
+    results.update(bench_field(Field, 'field'))
+    results.update(bench_field(BitboardField, 'bitboard'))
+    results.update(bench_input())
+
+    return results
@@ -0,0 +1,102 @@
+from bench import measure
+from bench.stubs import Headless, StubImage, StubSprite
+from src.core import KEY_LEFT, KEY_RIGHT, KEY_UP, KEY_DOWN, KEY_SPACE
+from src.generator import LevelGenerator
+from src.tween import TweenEngine, EASE_IN_OUT
+
+SCRIPT = [KEY_RIGHT, KEY_SPACE, KEY_DOWN, KEY_SPACE, KEY_LEFT, KEY_UP, KEY_SPACE, KEY_UP, KEY_SPACE, KEY_RIGHT]
+BOARD_SIZES = [7, 32, 96]
+
+
+class Levels:
+    def __init__(self, level):
+        self._level = level
+
+    def load(self, index: int):
+        return self._level
+
+
+def bench_play_state():
+    from src.environment import Canvas
+    from src.states import GameStateManager
+
+    canvas = Canvas()
+    gsm = GameStateManager(canvas)
+    gsm.set_state(gsm.play_state)
+    state = {'tick': 0}
+
+    def tick():
+        i = state['tick'] = state['tick'] + 1
+        symbol = SCRIPT[(i // 24) % len(SCRIPT)]
+        if i % 24 == 0:
+            gsm.on_key_press(symbol)
+        elif i % 24 == 12:
+            gsm.on_key_release(symbol)
+
+        gsm.update(1 / 120)
+
+    def frame():
+        tick()
+        gsm.draw(1.0)
+
+    return {'play_state.update': measure(tick, 5000), 'play_state.frame': measure(frame, 2000)}
+
+
+def bench_canvas():
+    from src.environment import Canvas
+
+    canvas = Canvas()
+    images = [StubImage(i % 2) for i in range(8)]
+    live = [canvas.get_sprite(images[i % 8], x=i, y=i) for i in range(256)]
+    state = {'index': 0}
+
+    def churn():
+        i = state['index'] = (state['index'] + 1) & 255
+        canvas.delete_sprite(live[i])
+        live[i] = canvas.get_sprite(images[i & 7], x=i, y=i)
+
+    return {'canvas.sprite_churn': measure(churn, 20000)}
+
+
+def bench_factory():
+    from src.environment import Canvas
+    from src.states import PuzzleFactory
+
+    results = {}
+    for size in BOARD_SIZES:
+        level = LevelGenerator(size, size, blocks=size, scramble=size * 4).generate(size)
+        field = level.create_field()
+
+        def build():
+            factory = PuzzleFactory(field, Canvas())
+            factory.create_pieces()
+            factory.build_environment()
+
+        results['factory.build_%sx%s' % (size, size)] = measure(build, 1, 5)
+
+    return results
+
+
+def bench_tweens(count=512):
+    engine = TweenEngine()
+    sprites = [StubSprite() for _ in range(count)]
+
+    def update():
+        if not len(engine):
+            for i, sprite in enumerate(sprites):
+                engine.add(sprite, (0, i), (640, i), 0.5, EASE_IN_OUT)
+
+        engine.update(1 / 120)
+
+    return {'tween.update_%s' % count: measure(update, 600)}
+
+
+def run():
+    results = {}
+    with Headless():
+        results.update(bench_canvas())
+        results.update(bench_play_state())
+        results.update(bench_factory())
+        results.update(bench_tweens())
+
+    return results
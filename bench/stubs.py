@@ -0,0 +1,98 @@
+import pyglet
+
+pyglet.options['shadow_window'] = False
+
+
+class StubTexture:
+    def __init__(self, texture_id: int):
+        self.id = texture_id
+
+
+class StubImage:
+    def __init__(self, texture_id=1):
+        self._texture = StubTexture(texture_id)
+
+    def get_texture(self):
+        return self._texture
+
+
+class StubBatch:
+    def __init__(self):
+        self.draws = 0
+
+    def draw(self):
+        self.draws += 1
+
+
+class StubSprite:
+    def __init__(self, img=None, batch=None, group=None, x=0, y=0):
+        self.image = img
+        self.batch, self.group = batch, group
+        self.x, self.y = x, y
+        self.visible = True
+
+    def update(self, x=None, y=None):
+        self.x, self.y = x, y
+
+    @property
+    def position(self):
+        return self.x, self.y
+
+    @position.setter
+    def position(self, values):
+        self.x, self.y = values
+
+    def delete(self):
+        self.batch = None
+
+
+class StubShape:
+    def __init__(self, *args, **kwargs):
+        self.x = args[0] if args else kwargs.get('x', 0)
+        self.y = args[1] if len(args) > 1 else kwargs.get('y', 0)
+        self.text = kwargs.get('text', '')
+        self.color = kwargs.get('color', (255, 255, 255, 255))
+        self.opacity = 255
+
+    @property
+    def position(self):
+        return self.x, self.y
+
+    @position.setter
+    def position(self, values):
+        self.x, self.y = values
+
+    def delete(self):
+        pass
+
+
+class Headless:
+    def __init__(self):
+        self._patches = []
+
+    def __enter__(self):
+        import src.environment as environment
+        import src.states as states
+        from src.util import ASSETS
+
+        images = {}
+        self._patch(environment, 'Batch', StubBatch)
+        self._patch(environment, 'Sprite', StubSprite)
+        self._patch(states, 'Rectangle', StubShape)
+        self._patch(states, 'Label', StubShape)
+        self._patch(ASSETS, 'get', lambda name: images.setdefault(name, StubImage(1)))
+
+        return self
+
+    def __exit__(self, *args):
+        for owner, attr, original in reversed(self._patches):
+            if original is None:
+                delattr(owner, attr)
+            else:
+                setattr(owner, attr, original)
+
+        self._patches.clear()
+
+    def _patch(self, owner, attr: str, value):
+        self._patches.append((owner, attr, vars(owner).get(attr)))
+        setattr(owner, attr, value)
@@ -0,0 +1,77 @@
+from random import Random
+import argparse
+import asyncio
+import json
+import time
+from src.core import KEY_LEFT, KEY_RIGHT, KEY_UP, KEY_DOWN, KEY_SPACE, KEY_UNDO
+
+KEYS = [KEY_LEFT, KEY_RIGHT, KEY_UP, KEY_DOWN, KEY_SPACE, KEY_UNDO]
+
+
+async def _request(reader, writer, line: str):
+    writer.write((line + '\n').encode('ascii'))
+    await writer.drain()
+    response = (await reader.readline()).decode('ascii').strip()
+    if response.startswith('ERROR'):
+        raise AttributeError(response)
+
+    return response
+
+
+async def _client(args, index: int, sessions: int, deadline: float, latencies: list):
+    rnd = Random(args.seed * 1000003 + index)
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    ids = [int((await _request(reader, writer, 'NEW %s' % args.level)).split()[1]) for _ in range(sessions)]
+    interval = 1 / args.rate if args.rate > 0 else 0.0
+
+    while ids and time.perf_counter() < deadline:
+        session = rnd.choice(ids)
+        symbol = rnd.choice(KEYS)
+        started = time.perf_counter()
+        await _request(reader, writer, 'PRESS %s %s' % (session, symbol))
+        await _request(reader, writer, 'RELEASE %s %s' % (session, symbol))
+        await _request(reader, writer, 'STATE %s' % session)
+        latencies.append(time.perf_counter() - started)
+
+        if interval:
+            await asyncio.sleep(interval)
+
+    writer.close()
+
+
+async def run(args):
+    per_client = [args.sessions // args.connections + (i < args.sessions % args.connections)
+                  for i in range(args.connections)]
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    await asyncio.gather(*[_client(args, i, count, deadline, latencies) for i, count in enumerate(per_client)])
+    elapsed = time.perf_counter() - started
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    stats = dict(item.split('=') for item in (await _request(reader, writer, 'STATS')).split()[1:])
+    writer.close()
+
+    latencies.sort()
+    count = len(latencies)
+
+    return {'sessions': args.sessions, 'connections': args.connections, 'interactions': count,
+            'interactions_per_second': count / elapsed if elapsed > 0 else 0.0,
+            'p50_ms': latencies[count // 2] * 1e3 if count else 0.0,
+            'p95_ms': latencies[min(int(0.95 * count), count - 1)] * 1e3 if count else 0.0,
+            'p99_ms': latencies[min(int(0.99 * count), count - 1)] * 1e3 if count else 0.0,
+            'server': stats}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulate many clients against a running puzzle server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7700)
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--connections', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--rate', type=float, default=20.0)
+    parser.add_argument('--level', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    print(json.dumps(asyncio.run(run(parser.parse_args())), indent=2))
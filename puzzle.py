@@ -1,40 +1,98 @@
+import sys
+from time import perf_counter
 from pyglet import app
 from pyglet import clock
 from pyglet.window import Window
 from pyglet import gl
-from src.environment import Canvas
+from src.environment import Canvas, CanvasEventLoop
+from src.timing import FixedTimestep
+from src.util import ASSETS, LEVELS_PATH
+from src.levels import LevelPack
+from src.replay import save_recording
+from src.profiler import Profiler
+from src.environment import ProfilerOverlay
 import src.states as states
 
 main_window = Window(576, 576)
 main_window.set_caption('Puzzle')
+ASSETS.preload()
 
 canvas = Canvas()
-gsm = states.GameStateManager(canvas)
+app.event_loop = CanvasEventLoop(canvas)
+gsm = states.GameStateManager(canvas, LevelPack(LEVELS_PATH))
 gsm.set_state(gsm.intro_state)
 
+record_path = sys.argv[sys.argv.index('--record') + 1] if '--record' in sys.argv else None
+if record_path is not None:
+    gsm.start_recording()
+
+profile_path = sys.argv[sys.argv.index('--profile') + 1] if '--profile' in sys.argv else None
+profiler, overlay = None, None
+if profile_path is not None:
+    profiler = Profiler()
+    states.instrument(profiler, canvas)
+    overlay = ProfilerOverlay(profiler, canvas)
+
+timestep = FixedTimestep()
+
 gl.glClearColor(40 / 255, 40 / 255, 40 / 255, 1)
 
 
+ticking = False
+
+
 def update(dt):
-    gsm.update(dt)
+    global ticking
+
+    for _ in range(timestep.advance(dt)):
+        gsm.update(timestep.get_step())
+
+    if overlay is None and gsm.is_idle():
+        clock.unschedule(update)
+        timestep.reset()
+        ticking = False
+
+
+def wake():
+    global ticking
+
+    if not ticking:
+        clock.schedule_interval(update, timestep.get_step())
+        ticking = True
 
 
 @main_window.event
 def on_key_press(symbol, modifiers):
-    gsm.on_key_press(symbol)
+    gsm.on_key_press(symbol, perf_counter())
+    wake()
 
 
 @main_window.event
 def on_key_release(symbol, modifiers):
-    gsm.on_key_release(symbol)
+    gsm.on_key_release(symbol, perf_counter())
+    wake()
+
+
+@main_window.event
+def on_expose():
+    canvas.mark_dirty()
 
 
 @main_window.event
 def on_draw():
     main_window.clear()
-    gsm.draw()
+    gsm.draw(timestep.get_alpha())
+
+    if overlay is not None:
+        overlay.update()
 
 
 if __name__ == '__main__':
-    clock.schedule_interval(update, 1 / 120.0)
+    wake()
     app.run()
+
+    if record_path is not None:
+        save_recording(record_path, gsm.stop_recording().get_recording())
+
+    if profile_path is not None:
+        profiler.export(profile_path)
@@ -0,0 +1,122 @@
+import os
+import time
+
+
+class AtlasLoader:
+    def __init__(self, size=512, border=1):
+        from pyglet.image.atlas import TextureBin
+
+        self._bin = TextureBin(size, size)
+        self._border = border
+        self._regions = {}
+
+    def load(self, path: str):
+        region = self._regions.get(path)
+        if region is None:
+            from pyglet.image import load
+
+            region = self._bin.add(load(path), border=self._border)
+            self._regions[path] = region
+
+        return region
+
+    def get_texture_count(self):
+        return len(self._bin.atlases)
+
+    def get_region_count(self):
+        return len(self._regions)
+
+    def get_stats(self, batch):
+        stats = count_batch_state(batch)
+        stats['atlases'] = self.get_texture_count()
+        stats['regions'] = self.get_region_count()
+
+        return stats
+
+
+class AssetRegistry:
+    def __init__(self, root: str):
+        self._root = root
+        self._images = {}
+        self._fonts = {}
+        self._cache = {}
+        self._timings = {}
+        self._loader = None
+
+    def register(self, name: str, *path):
+        self._images[name] = os.path.join(self._root, *path)
+
+    def register_font(self, name: str, family: str, *path):
+        self._fonts[name] = (family, os.path.join(self._root, *path))
+
+    def get_path(self, name: str):
+        if name in self._fonts:
+            return self._fonts[name][1]
+
+        return self._images[name]
+
+    def get(self, name: str):
+        asset = self._cache.get(name)
+        if asset is not None:
+            return asset
+
+        started = time.perf_counter()
+        if name in self._fonts:
+            from pyglet import font
+
+            family, path = self._fonts[name]
+            font.add_file(path)
+            asset = font.load(family)
+        elif name in self._images:
+            asset = self.get_loader().load(self._images[name])
+        else:
+            raise AttributeError("Unknown asset '%s'" % name)
+
+        self._timings[name] = time.perf_counter() - started
+        self._cache[name] = asset
+
+        return asset
+
+    def is_loaded(self, name: str):
+        return name in self._cache
+
+    def preload(self, names=None):
+        if names is None:
+            names = list(self._fonts) + list(self._images)
+
+        for name in names:
+            self.get(name)
+
+        return {name: self._timings[name] for name in names}
+
+    def get_timings(self):
+        return dict(self._timings)
+
+    def get_loader(self):
+        if self._loader is None:
+            self._loader = AtlasLoader()
+
+        return self._loader
+
+
+def count_batch_state(batch):
+    textures, groups = set(), 0
+    pending = list(batch.top_groups)
+
+    while pending:
+        group = pending.pop()
+        if not group.visible:
+            continue
+
+        domains = batch.group_map.get(group, {})
+        children = batch.group_children.get(group, [])
+        if domains or children:
+            groups += 1
+
+        texture = getattr(group, 'texture', None)
+        if texture is not None and domains:
+            textures.add(texture.id)
+
+        pending.extend(children)
+
+    return {'textures': len(textures), 'state_changes': groups * 2}
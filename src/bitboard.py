@@ -0,0 +1,96 @@
+from array import array
+from src.core import Field, BLOCKED
+
+BLOCKING = tuple(tile // 10 in BLOCKED for tile in range(256))
+
+
+class BitboardField(Field):
+    def __init__(self, scheme: dict, matrix=None, background=None):
+        super().__init__(scheme, matrix, background)
+        self._height = len(self._matrix)
+        self._width = len(self._matrix[0])
+        self._tiles = array('B', [tile for row in self._matrix for tile in row])
+        self._blocked = 0
+        self._kinds = None
+        self._matrix = None
+
+    def _index(self):
+        self._blocked = 0
+        self._kinds = {}
+
+        for i, tile in enumerate(self._tiles):
+            bit = 1 << i
+            if BLOCKING[tile]:
+                self._blocked |= bit
+
+            self._kinds[tile] = self._kinds.get(tile, 0) | bit
+
+        return self._kinds
+
+    def get_size(self):
+        return self._height
+
+    def get_width(self):
+        return self._width
+
+    def update_field(self, col: int, row: int, tile: int):
+        if not (0 <= row < self._height and 0 <= col < self._width):
+            raise AttributeError("Tile<%s> outside matrix: col='%s', row='%s'" % (tile, col, row))
+
+        i = row * self._width + col
+        old = self._tiles[i]
+        if old != tile:
+            self._track(col, row, old, tile)
+            self._tiles[i] = tile
+            self._kinds = None
+
+    def is_blocked(self, col: int, row: int):
+        return BLOCKING[self._tiles[row * self._width + col]]
+
+    def get_tile(self, col: int, row: int):
+        return self._tiles[row * self._width + col]
+
+    def get_matrix(self):
+        return [self._tiles[row * self._width:(row + 1) * self._width].tolist() for row in range(self._height)]
+
+    def get_mask(self, kind: int):
+        return (self._kinds or self._index()).get(kind, 0)
+
+    def get_blocked_mask(self):
+        if self._kinds is None:
+            self._index()
+
+        return self._blocked
+
+    def cells_of_kind(self, kind: int):
+        cells = []
+        rest = self.get_mask(kind)
+
+        while rest:
+            low = rest & -rest
+            rest ^= low
+            i = low.bit_length() - 1
+            cells.append((i % self._width, i // self._width))
+
+        return cells
+
+    def free_neighbours(self, col: int, row: int):
+        neighbours = []
+        for c, r in ((col - 1, row), (col + 1, row), (col, row - 1), (col, row + 1)):
+            if 0 <= r < self._height and 0 <= c < self._width and not BLOCKING[self._tiles[r * self._width + c]]:
+                neighbours.append((c, r))
+
+        return neighbours
+
+    def key(self):
+        return self._tiles.tobytes()
+
+    def copy(self):
+        field = BitboardField.__new__(BitboardField)
+        field.__dict__.update(self.__dict__)
+        field._tiles = array('B', self._tiles)
+        field._kinds = None if self._kinds is None else dict(self._kinds)
+        field._kind_counts = dict(self._kind_counts)
+        field._rule_counts = list(self._rule_counts)
+
+        return field
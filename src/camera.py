@@ -0,0 +1,44 @@
+from src.core import offset_x, offset_y, TILE_SIZE
+
+
+class Camera:
+    def __init__(self, width: int, height: int, board_width: int, board_height: int, margin=2 * TILE_SIZE):
+        self._width, self._height = width, height
+        self._board_width, self._board_height = board_width, board_height
+        self._margin = margin
+        self._max_x = max(0, 2 * offset_x + board_width * TILE_SIZE - width)
+        self._max_y = max(0, 2 * offset_y + board_height * TILE_SIZE - height)
+        self._x, self._y = 0, 0
+
+    def follow(self, x: float, y: float):
+        if x - self._x < self._margin:
+            self._x = x - self._margin
+        elif x + TILE_SIZE - self._x > self._width - self._margin:
+            self._x = x + TILE_SIZE - self._width + self._margin
+
+        if y - self._y < self._margin:
+            self._y = y - self._margin
+        elif y + TILE_SIZE - self._y > self._height - self._margin:
+            self._y = y + TILE_SIZE - self._height + self._margin
+
+        self._x = int(min(max(self._x, 0), self._max_x))
+        self._y = int(min(max(self._y, 0), self._max_y))
+
+        return self._x, self._y
+
+    def center(self, x: float, y: float):
+        self._x = x + TILE_SIZE // 2 - self._width // 2
+        self._y = y + TILE_SIZE // 2 - self._height // 2
+
+        return self.follow(x, y)
+
+    def get_position(self):
+        return self._x, self._y
+
+    def get_tiles(self, extra=1):
+        left = max((self._x - offset_x) // TILE_SIZE - extra, 0)
+        top = max((self._y - offset_y) // TILE_SIZE - extra, 0)
+        right = min((self._x + self._width - offset_x) // TILE_SIZE + extra, self._board_width - 1)
+        bottom = min((self._y + self._height - offset_y) // TILE_SIZE + extra, self._board_height - 1)
+
+        return left, top, right, bottom
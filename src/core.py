@@ -0,0 +1,676 @@
+from array import array
+from collections import deque
+from struct import pack, unpack_from
+from time import perf_counter
+from src.tween import TweenEngine, LINEAR
+
+offset_x, offset_y = 64, 64
+TILE_SIZE = 64
+
+ANIMATION_RATE = 220
+SIMULATION_RATE = 120
+BLOCKED = [1, 2]
+EMPTY, WALL = 0, 10
+FIRST_KIND, SECOND_KIND, THIRD_KIND = 21, 22, 23
+KINDS = [FIRST_KIND, SECOND_KIND, THIRD_KIND]
+
+LEFT, RIGHT, UP, DOWN = 'left', 'right', 'up', 'down'
+LINES = {'first_line': 1, 'second_line': 3, 'third_line': 5}
+
+KEY_SPACE, KEY_ENTER = 0x20, 0xff0d
+KEY_LEFT, KEY_UP, KEY_RIGHT, KEY_DOWN = 0xff51, 0xff52, 0xff53, 0xff54
+KEY_HINT, KEY_REDO, KEY_UNDO = 0x68, 0x79, 0x7a
+KEY_DIRECTIONS = [(KEY_LEFT, LEFT), (KEY_RIGHT, RIGHT), (KEY_UP, UP), (KEY_DOWN, DOWN)]
+LATENCY_SAMPLES = 1024
+
+
+class Goal:
+    def __init__(self, rules=None):
+        self._rules = rules if rules is not None else []
+
+    @staticmethod
+    def from_scheme(scheme: dict, width: int, height: int):
+        goal = Goal()
+        rows, cols = range(1, height - 1), range(1, width - 1)
+
+        for name, col in LINES.items():
+            if name in scheme:
+                goal.add_column(col, scheme[name], rows)
+
+        for col, kind in scheme.get('columns', []):
+            goal.add_column(col, kind, rows)
+
+        for row, kind in scheme.get('rows', []):
+            goal.add_row(row, kind, cols)
+
+        for cells, kind in scheme.get('cells', []):
+            goal.add_cells([tuple(cell) for cell in cells], kind)
+
+        return goal
+
+    def add_cells(self, cells: list, kind: int):
+        self._rules.append((tuple(cells), kind))
+
+    def add_column(self, col: int, kind: int, rows):
+        self.add_cells([(col, row) for row in rows], kind)
+
+    def add_row(self, row: int, kind: int, cols):
+        self.add_cells([(col, row) for col in cols], kind)
+
+    def get_rules(self):
+        return self._rules
+
+
+class Field:
+    def __init__(self, scheme: dict, matrix=None, background=None):
+        if background is None:
+            background = [
+                [0, 4, 7, 5, 7, 6, 0, 0],
+                [0, 1, 2, 2, 2, 2, 2, 0],
+                [0, 3, 0, 0, 0, 0, 0, 0],
+                [0, 3, 0, 0, 0, 0, 0, 0],
+                [0, 3, 0, 0, 0, 0, 0, 0],
+                [0, 3, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0]
+            ]
+
+        if matrix is None:
+            matrix = [
+                [10, 10, 10, 10, 10, 10, 10],
+                [10, 23, 10, 23, 10, 22, 10],
+                [10, 0, 21, 22, 22, 21, 10],
+                [10, 0, 10, 21, 10, 0, 10],
+                [10, 21, 23, 22, 0, 23, 10],
+                [10, 22, 10, 23, 10, 21, 10],
+                [10, 10, 10, 10, 10, 10, 10]
+            ]
+
+        self._background = [row[:] for row in background]
+        self._matrix = [row[:] for row in matrix]
+        self._scheme = scheme
+        self._goal = Goal.from_scheme(scheme, len(self._matrix[0]), len(self._matrix))
+        self._count_goal()
+
+    def _count_goal(self):
+        self._kind_counts = {}
+        for row in self._matrix:
+            for tile in row:
+                self._kind_counts[tile] = self._kind_counts.get(tile, 0) + 1
+
+        self._cell_rules = {}
+        self._rule_counts = []
+        self._unsatisfied = 0
+
+        for i, (cells, kind) in enumerate(self._goal.get_rules()):
+            count = 0
+            for col, row in cells:
+                self._cell_rules.setdefault((col, row), []).append(i)
+                if self._matrix[row][col] == kind:
+                    count += 1
+
+            self._rule_counts.append(count)
+            if count != len(cells):
+                self._unsatisfied += 1
+
+    def _track(self, col: int, row: int, old: int, tile: int):
+        if old == tile:
+            return
+
+        self._kind_counts[old] -= 1
+        self._kind_counts[tile] = self._kind_counts.get(tile, 0) + 1
+
+        rules = self._cell_rules.get((col, row))
+        if rules is None:
+            return
+
+        for i in rules:
+            cells, kind = self._goal.get_rules()[i]
+            satisfied = self._rule_counts[i] == len(cells)
+
+            if old == kind:
+                self._rule_counts[i] -= 1
+            elif tile == kind:
+                self._rule_counts[i] += 1
+
+            if satisfied != (self._rule_counts[i] == len(cells)):
+                self._unsatisfied += 1 if satisfied else -1
+
+    def is_solved(self):
+        return self._unsatisfied == 0
+
+    def check_vertical_lines(self):
+        return self._unsatisfied == 0
+
+    def get_size(self):
+        return len(self._matrix)
+
+    def get_width(self):
+        return len(self._matrix[0])
+
+    def update_field(self, col: int, row: int, tile: int):
+        if not (0 <= row < len(self._matrix) or 0 <= col < len(self._matrix[0])):
+            raise AttributeError("Tile<%s> outside matrix: col='%s', row='%s'" % (tile, col, row))
+
+        self._track(col, row, self._matrix[row][col], tile)
+        self._matrix[row][col] = tile
+
+    def is_blocked(self, col: int, row: int):
+        return (self._matrix[row][col] // 10) in BLOCKED
+
+    def get_tile(self, col: int, row: int):
+        return self._matrix[row][col]
+
+    def get_background_tile(self, col: int, row: int):
+        return self._background[row][col]
+
+    def get_matrix(self):
+        return [row[:] for row in self._matrix]
+
+    def get_background(self):
+        return [row[:] for row in self._background]
+
+    def get_scheme(self):
+        return self._scheme
+
+    def get_goal(self):
+        return self._goal
+
+    def get_kind_count(self, kind: int):
+        return self._kind_counts.get(kind, 0)
+
+
+class MovementAnimation:
+    def __init__(self, col, row):
+        self._col, self._row = col, row
+        self._x, self._y = offset_x + col * TILE_SIZE, offset_y + row * TILE_SIZE
+        self._prev_x, self._prev_y = self._x, self._y
+        self._dx, self._dy = 0, 0
+        self._is_moving = False
+        self._tweens = None
+
+    def set_tweens(self, tweens: TweenEngine):
+        self._tweens = tweens
+
+    def move_down(self):
+        self._start(0, 1)
+
+    def move_up(self):
+        self._start(0, -1)
+
+    def move_right(self):
+        self._start(1, 0)
+
+    def move_left(self):
+        self._start(-1, 0)
+
+    def _start(self, dc: int, dr: int):
+        if self._is_moving:
+            return
+
+        self._col += dc
+        self._row += dr
+        self._dx, self._dy = dc * ANIMATION_RATE, dr * ANIMATION_RATE
+        self._is_moving = True
+        self._tween(TILE_SIZE / ANIMATION_RATE)
+
+    def _tween(self, duration: float):
+        self._tweens.add(self, (self._x, self._y), (offset_x + self._col * TILE_SIZE, offset_y + self._row * TILE_SIZE),
+                         duration, LINEAR, self._arrive)
+
+    def _arrive(self):
+        self._x, self._y = offset_x + self._col * TILE_SIZE, offset_y + self._row * TILE_SIZE
+        self._dx = self._dy = 0
+        self._is_moving = False
+        self.settle()
+
+    def _stop(self):
+        if self._tweens is not None:
+            self._tweens.cancel(self)
+
+        self._x, self._y = offset_x + self._col * TILE_SIZE, offset_y + self._row * TILE_SIZE
+        self._dx = self._dy = 0
+        self._is_moving = False
+        self.settle()
+
+    @property
+    def position(self):
+        return self._x, self._y
+
+    @position.setter
+    def position(self, position: tuple):
+        self._x, self._y = position
+
+    def is_moving(self):
+        return self._is_moving
+
+    def get_col(self):
+        return self._col
+
+    def get_row(self):
+        return self._row
+
+    def get_x(self):
+        return self._x
+
+    def get_y(self):
+        return self._y
+
+    def get_render_position(self, alpha: float):
+        return (self._prev_x + (self._x - self._prev_x) * alpha,
+                self._prev_y + (self._y - self._prev_y) * alpha)
+
+    def settle(self):
+        self._prev_x, self._prev_y = self._x, self._y
+
+    def get_motion(self):
+        return self._col, self._row, self._x, self._y, self._dx, self._dy, self._is_moving
+
+    def set_motion(self, col: int, row: int, x: float, y: float, dx: float, dy: float, is_moving: bool):
+        self._col, self._row = col, row
+        self._stop()
+        if not is_moving:
+            return
+
+        self._x, self._y = x, y
+        self._dx, self._dy = dx, dy
+        self._is_moving = True
+        self.settle()
+        self._tween((abs(offset_x + col * TILE_SIZE - x) + abs(offset_y + row * TILE_SIZE - y)) / ANIMATION_RATE)
+
+
+class Occupancy:
+    def __init__(self):
+        self._cells = {}
+
+    def add(self, piece):
+        self._cells[(piece.get_col(), piece.get_row())] = piece
+        piece.attach(self)
+
+    def move(self, piece, old: tuple, new: tuple):
+        if self._cells.get(old) is piece:
+            del self._cells[old]
+
+        self._cells[new] = piece
+
+    def get(self, col: int, row: int):
+        return self._cells.get((col, row))
+
+    def neighbours(self, col: int, row: int):
+        neighbours = []
+        for cell in ((col - 1, row), (col + 1, row), (col, row - 1), (col, row + 1)):
+            piece = self._cells.get(cell)
+            if piece is not None:
+                neighbours.append(piece)
+
+        return neighbours
+
+    def __len__(self):
+        return len(self._cells)
+
+
+class Piece(MovementAnimation):
+    def __init__(self, field: Field, kind: int, col, row):
+        super().__init__(col, row)
+        self._kind = kind
+        self._field = field
+        self._occupancy = None
+        self._cell = (col, row)
+
+    def attach(self, occupancy: Occupancy):
+        self._occupancy = occupancy
+        self._cell = (self._col, self._row)
+
+    def move_down(self):
+        self._commit(0, 1, super().move_down)
+
+    def move_up(self):
+        self._commit(0, -1, super().move_up)
+
+    def move_right(self):
+        self._commit(1, 0, super().move_right)
+
+    def move_left(self):
+        self._commit(-1, 0, super().move_left)
+
+    def _commit(self, dc: int, dr: int, start):
+        col, row = self._col + dc, self._row + dr
+        if self._is_moving or self._field.is_blocked(col, row):
+            return
+
+        self._field.update_field(self._col, self._row, EMPTY)
+        self._field.update_field(col, row, self._kind)
+        start()
+
+        if self._occupancy is not None:
+            self._occupancy.move(self, self._cell, (col, row))
+        self._cell = (col, row)
+
+    def place(self, col: int, row: int):
+        self._field.update_field(self._col, self._row, EMPTY)
+        self._col, self._row = col, row
+        self._stop()
+        self._field.update_field(col, row, self._kind)
+
+        if self._occupancy is not None:
+            self._occupancy.move(self, self._cell, (col, row))
+            self._cell = (col, row)
+
+    def on_select(self):
+        pass
+
+    def on_drop(self):
+        self.settle()
+
+    def get_cell(self):
+        return self._cell
+
+    def get_kind(self):
+        return self._kind
+
+    def __str__(self):
+        return "<Piece col='%s' row='%s' x='%s' y='%s'>" % (self._col, self._row, self._x, self._y)
+
+
+class Selection(MovementAnimation):
+    def __init__(self, col, row, bounds=(1, 1, 5, 5)):
+        super().__init__(col, row)
+        self._current_piece = None
+        self._active = False
+        self._min_col, self._min_row, self._max_col, self._max_row = bounds
+
+    def move_down(self):
+        if self._active:
+            self._current_piece.move_down()
+
+        if not self._active and self._row < self._max_row:
+            super().move_down()
+
+    def move_up(self):
+        if self._active:
+            self._current_piece.move_up()
+
+        if not self._active and self._row > self._min_row:
+            super().move_up()
+
+    def move_right(self):
+        if self._active:
+            self._current_piece.move_right()
+
+        if not self._active and self._col < self._max_col:
+            super().move_right()
+
+    def move_left(self):
+        if self._active:
+            self._current_piece.move_left()
+
+        if not self._active and self._col > self._min_col:
+            super().move_left()
+
+    def get_focus(self):
+        return self._current_piece if self._active else self
+
+    def select(self, piece: Piece):
+        self._current_piece = piece
+        self._current_piece.on_select()
+        self._active = True
+
+    def drop(self):
+        self._col = self._current_piece.get_col()
+        self._row = self._current_piece.get_row()
+        self._x = offset_x + self._col * TILE_SIZE
+        self._y = offset_y + self._row * TILE_SIZE
+        self.settle()
+        self._current_piece.on_drop()
+        self._current_piece = None
+        self._active = False
+
+    def place(self, col: int, row: int):
+        self._col, self._row = col, row
+        self._stop()
+
+    def get_current_piece(self):
+        return self._current_piece
+
+    def get_focus_position(self, alpha: float):
+        return self.get_focus().get_render_position(alpha)
+
+    def is_moving(self):
+        if self._current_piece is not None:
+            return self._current_piece.is_moving()
+
+        return self._is_moving
+
+    def is_active(self):
+        return self._active
+
+
+class History:
+    def __init__(self):
+        self._moves = array('H')
+        self._size = 0
+
+    def push(self, old: tuple, new: tuple):
+        del self._moves[self._size * 4:]
+        self._moves.extend((old[0], old[1], new[0], new[1]))
+        self._size += 1
+
+    def undo(self):
+        if self._size == 0:
+            return None
+
+        self._size -= 1
+        i = self._size * 4
+        return (self._moves[i], self._moves[i + 1]), (self._moves[i + 2], self._moves[i + 3])
+
+    def redo(self):
+        i = self._size * 4
+        if i >= len(self._moves):
+            return None
+
+        self._size += 1
+        return (self._moves[i], self._moves[i + 1]), (self._moves[i + 2], self._moves[i + 3])
+
+    def can_undo(self):
+        return self._size > 0
+
+    def can_redo(self):
+        return self._size * 4 < len(self._moves)
+
+    def clear(self):
+        del self._moves[:]
+        self._size = 0
+
+    def encode(self):
+        return pack('<I', self._size) + self._moves.tobytes()
+
+    def decode(self, data):
+        if len(data) < 4 or (len(data) - 4) % 8 or unpack_from('<I', data)[0] * 8 > len(data) - 4:
+            raise AttributeError("Corrupt move history of %s bytes" % len(data))
+
+        self._size = unpack_from('<I', data)[0]
+        self._moves = array('H')
+        self._moves.frombytes(bytes(data[4:]))
+
+    def __len__(self):
+        return self._size
+
+
+class Puzzle:
+    def __init__(self, field: Field, pieces=None, selection=None):
+        self._field = field
+        self._history = History()
+        self._pieces = pieces if pieces is not None else self.create_pieces(field)
+        self._selection = selection if selection is not None else Selection(1, 4, self.get_bounds(field))
+        self._occupancy = Occupancy()
+        self._tweens = TweenEngine()
+        self._selection.set_tweens(self._tweens)
+
+        for piece in self._pieces:
+            self._occupancy.add(piece)
+            piece.set_tweens(self._tweens)
+
+    @staticmethod
+    def get_bounds(field: Field):
+        return 1, 1, field.get_width() - 2, field.get_size() - 2
+
+    @staticmethod
+    def create_pieces(field: Field, new_instance=Piece) -> list:
+        pieces = []
+        for i in range(1, field.get_size() - 1):
+            for j in range(1, field.get_width() - 1):
+                kind = field.get_tile(j, i)
+
+                if kind not in KINDS:
+                    continue
+
+                pieces.append(new_instance(field, kind, j, i))
+
+        return pieces
+
+    def update(self, dt):
+        self._selection.get_focus().settle()
+        self._tweens.update(dt)
+
+    def undo(self):
+        move = None if self._selection.is_moving() else self._history.undo()
+        if move is None:
+            return False
+
+        self._restore(move[1], move[0])
+        return True
+
+    def redo(self):
+        move = None if self._selection.is_moving() else self._history.redo()
+        if move is None:
+            return False
+
+        self._restore(move[0], move[1])
+        return True
+
+    def _restore(self, source: tuple, target: tuple):
+        if self._selection.is_active():
+            self._selection.drop()
+
+        self._occupancy.get(*source).place(*target)
+        self._selection.place(*target)
+
+    def move(self, direction):
+        piece = self._selection.get_current_piece()
+        cell = piece.get_cell() if piece is not None else None
+
+        if direction == LEFT:
+            self._selection.move_left()
+        elif direction == RIGHT:
+            self._selection.move_right()
+        elif direction == UP:
+            self._selection.move_up()
+        elif direction == DOWN:
+            self._selection.move_down()
+
+        if piece is not None and piece.get_cell() != cell:
+            self._history.push(cell, piece.get_cell())
+
+    def toggle(self):
+        if self._selection.is_moving():
+            return
+
+        if self._selection.is_active():
+            self._selection.drop()
+            return
+
+        piece = self.piece_at(self._selection.get_col(), self._selection.get_row())
+
+        if piece is not None:
+            self._selection.select(piece)
+
+    def piece_at(self, col: int, row: int):
+        return self._occupancy.get(col, row)
+
+    def neighbours(self, col: int, row: int):
+        return self._occupancy.neighbours(col, row)
+
+    def is_solved(self):
+        return self._field.is_solved() and not self._selection.is_active()
+
+    def get_field(self):
+        return self._field
+
+    def get_pieces(self):
+        return self._pieces
+
+    def get_history(self):
+        return self._history
+
+    def get_tweens(self):
+        return self._tweens
+
+    def get_occupancy(self):
+        return self._occupancy
+
+    def get_selection(self):
+        return self._selection
+
+
+class Controller:
+    def __init__(self, puzzle: Puzzle, repeat_delay=0.0, repeat_interval=0.0, latency=None, clock=perf_counter):
+        self._puzzle = puzzle
+        self._directions = dict(KEY_DIRECTIONS)
+        self._repeat_delay = repeat_delay
+        self._repeat_interval = repeat_interval
+        self._clock = clock
+        self._queue = deque()
+        self._held = {}
+        self._time = 0.0
+        self._latency = latency
+
+    def on_key_press(self, symbol, timestamp=None):
+        self._queue.append((self._clock() if timestamp is None else timestamp, True, symbol))
+
+    def on_key_release(self, symbol, timestamp=None):
+        self._queue.append((self._clock() if timestamp is None else timestamp, False, symbol))
+
+    def update(self, dt):
+        self._time += dt
+        self._puzzle.update(dt)
+        selection = self._puzzle.get_selection()
+        restored = False
+
+        while self._queue and not selection.is_moving():
+            timestamp, pressed, symbol = self._queue.popleft()
+
+            if not pressed:
+                self._held.pop(symbol, None)
+            elif symbol in self._directions:
+                self._held.pop(symbol, None)
+                self._held[symbol] = self._time + self._repeat_delay
+                self._puzzle.move(self._directions[symbol])
+                if self._latency is not None and selection.is_moving():
+                    self._latency.add(self._clock() - timestamp)
+            elif symbol == KEY_SPACE or symbol == KEY_ENTER:
+                self._puzzle.toggle()
+            elif symbol == KEY_UNDO:
+                self._puzzle.undo()
+                restored = True
+            elif symbol == KEY_REDO:
+                self._puzzle.redo()
+                restored = True
+
+        if self._held and not self._queue and not selection.is_moving():
+            symbol = next(reversed(self._held))
+            if self._time >= self._held[symbol]:
+                self._held[symbol] = self._time + self._repeat_interval
+                self._puzzle.move(self._directions[symbol])
+
+        return restored
+
+    def is_idle(self):
+        return not self._held and not self._queue and not self._puzzle.get_selection().is_moving()
+
+    def get_pending(self):
+        return len(self._queue)
+
+    def get_latency(self):
+        return self._latency
+
+    def get_puzzle(self):
+        return self._puzzle
@@ -0,0 +1,348 @@
+from struct import Struct
+from math import comb
+import mmap
+import os
+from src.core import Goal, KINDS, EMPTY
+from src.solver import Layout, DIRECTIONS, _combinations
+
+TABLE_MAGIC = b'PZLD'
+TABLE_VERSION = 1
+TABLE_LIMIT = 1 << 26
+
+TABLE_HEADER = Struct('<4sHHBQ')
+CELL = Struct('<HHB')
+
+UNKNOWN = 3
+
+
+class Ranking:
+    def __init__(self, size: int, counts: list):
+        self._size = size
+        self._counts = counts
+        self._binomial = [[comb(n, k) for k in range(size + 1)] for n in range(size + 1)]
+        self._scales = []
+        free, scale = size, 1
+
+        for count in counts:
+            self._scales.append(scale)
+            scale *= comb(free, count)
+            free -= count
+
+        self._states = scale
+
+    def get_states(self):
+        return self._states
+
+    def rank(self, masks: list, start=0, rank=0, taken=0):
+        binomial = self._binomial
+
+        for mask, scale in zip(masks[start:], self._scales[start:]):
+            value, j, rest = 0, 1, mask
+            while rest:
+                low = rest & -rest
+                rest ^= low
+                value += binomial[low.bit_length() - 1 - (taken & (low - 1)).bit_count()][j]
+                j += 1
+
+            rank += value * scale
+            taken |= mask
+
+        return rank
+
+    def unrank(self, rank: int):
+        binomial = self._binomial
+        free = list(range(self._size))
+        masks = []
+
+        for count, scale in zip(self._counts, self._scales):
+            value = (rank // scale) % binomial[len(free)][count]
+            chosen = []
+
+            for j in range(count, 0, -1):
+                position = j - 1
+                while binomial[position + 1][j] <= value:
+                    position += 1
+
+                value -= binomial[position][j]
+                chosen.append(free[position])
+
+            mask = 0
+            for cell in chosen:
+                mask |= 1 << cell
+            masks.append(mask)
+            free = [cell for cell in free if not mask >> cell & 1]
+
+        return masks
+
+
+class DistanceTable:
+    def __init__(self, cells: list, goals: list, kinds: list, counts: list, data):
+        self._cells = cells
+        self._index = {cell: i for i, cell in enumerate(cells)}
+        self._goals = goals
+        self._kinds = kinds
+        self._counts = counts
+        self._data = data
+        self._ranking = Ranking(len(cells), counts)
+        self._neighbours = [[(self._index[(col + dc, row + dr)], direction)
+                             for direction, (dc, dr) in DIRECTIONS.items() if (col + dc, row + dr) in self._index]
+                            for col, row in cells]
+
+    @staticmethod
+    def build(matrix: list, scheme: dict, limit=TABLE_LIMIT):
+        layout = Layout(matrix, Goal.from_scheme(scheme, len(matrix[0]), len(matrix)))
+        if not layout.is_feasible():
+            raise AttributeError("Level goal can not be reached")
+
+        start = layout.decode(layout.get_start())
+        present = [k for k, mask in enumerate(start) if mask]
+        goal_masks = layout.get_goal_masks()
+        cells = [layout.get_cell(i) for i in range(layout.get_size())]
+        counts = [bin(start[k]).count('1') for k in present]
+        ranking = Ranking(len(cells), counts)
+
+        if ranking.get_states() > limit:
+            raise AttributeError("Level has %s states, over the table limit of %s" % (ranking.get_states(), limit))
+
+        goals = [0] * len(cells)
+        for k in present:
+            for i in range(len(cells)):
+                if goal_masks[k] >> i & 1:
+                    goals[i] = KINDS[k]
+
+        data = bytearray(b'\xff') * ((ranking.get_states() + 3) // 4)
+        table = DistanceTable(cells, goals, [KINDS[k] for k in present], counts, data)
+        table._search([goal_masks[k] for k in present])
+
+        return table
+
+    @staticmethod
+    def load(path: str):
+        with open(path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, size, kinds, states = TABLE_HEADER.unpack_from(data, 0)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            data.close()
+            raise AttributeError("Unsupported distance table: '%s'" % path)
+
+        offset = TABLE_HEADER.size
+        kind_counts = [(data[offset + 2 * i], data[offset + 2 * i + 1]) for i in range(kinds)]
+        offset += 2 * kinds
+        cells, goals = [], []
+        for i in range(size):
+            col, row, goal = CELL.unpack_from(data, offset + i * CELL.size)
+            cells.append((col, row))
+            goals.append(goal)
+        offset += size * CELL.size
+
+        return DistanceTable(cells, goals, [kind for kind, _ in kind_counts], [count for _, count in kind_counts],
+                             memoryview(data)[offset:offset + (states + 3) // 4])
+
+    def save(self, path: str):
+        with open(path, 'wb') as file:
+            file.write(TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, len(self._cells), len(self._kinds),
+                                         self._ranking.get_states()))
+            file.write(bytes(value for pair in zip(self._kinds, self._counts) for value in pair))
+            file.write(b''.join(CELL.pack(col, row, goal) for (col, row), goal in zip(self._cells, self._goals)))
+            file.write(self._data)
+
+    def _search(self, goal_masks: list):
+        free = [i for i in range(len(self._cells)) if not self._goals[i]]
+        frontier = []
+
+        def fill(k: int, taken: int, masks: list):
+            if k == len(self._kinds):
+                frontier.append(self._ranking.rank(masks))
+                return
+
+            cells = [i for i in free if not taken >> i & 1]
+            extra = self._counts[k] - bin(goal_masks[k]).count('1')
+            for mask in _combinations(cells, extra, goal_masks[k]):
+                fill(k + 1, taken | mask, masks + [mask])
+
+        fill(0, 0, [])
+        for rank in frontier:
+            self._store(rank, 0)
+
+        depth = 0
+        while frontier:
+            depth += 1
+            frontier = [rank for state in frontier for rank in self._successors(self._ranking.unrank(state))
+                        if self._value(rank) == UNKNOWN and self._store(rank, depth % 3)]
+
+    def _successors(self, masks: list):
+        ranking = self._ranking
+        occupied = 0
+        for mask in masks:
+            occupied |= mask
+
+        prefix, taken = 0, 0
+        for k, mask in enumerate(masks):
+            rest = mask
+            while rest:
+                low = rest & -rest
+                rest ^= low
+
+                for neighbour, _ in self._neighbours[low.bit_length() - 1]:
+                    if not occupied >> neighbour & 1:
+                        moved = list(masks)
+                        moved[k] = mask ^ low ^ (1 << neighbour)
+                        yield ranking.rank(moved, k, prefix, taken)
+
+            prefix = ranking.rank(masks[:k + 1], k, prefix, taken)
+            taken |= mask
+
+    def _value(self, rank: int):
+        return self._data[rank >> 2] >> ((rank & 3) << 1) & 3
+
+    def _store(self, rank: int, value: int):
+        shift = (rank & 3) << 1
+        self._data[rank >> 2] = self._data[rank >> 2] & ~(3 << shift) | value << shift
+
+        return True
+
+    def get_masks(self, field):
+        masks = [0] * len(self._kinds)
+
+        for i, (col, row) in enumerate(self._cells):
+            tile = field.get_tile(col, row)
+            if tile != EMPTY:
+                if tile not in self._kinds:
+                    return None
+                masks[self._kinds.index(tile)] |= 1 << i
+
+        if any(bin(mask).count('1') != count for mask, count in zip(masks, self._counts)):
+            return None
+
+        return masks
+
+    def get_states(self):
+        return self._ranking.get_states()
+
+    def get_cells(self):
+        return self._cells
+
+    def is_goal(self, masks: list):
+        for i, goal in enumerate(self._goals):
+            if goal and not masks[self._kinds.index(goal)] >> i & 1:
+                return False
+
+        return True
+
+    def value(self, masks: list):
+        return self._value(self._ranking.rank(masks))
+
+    def is_move(self, masks: list, moved: list):
+        changed = [mask ^ other for mask, other in zip(masks, moved) if mask != other]
+        if len(changed) != 1 or changed[0].bit_count() != 2:
+            return False
+
+        low = changed[0] & -changed[0]
+        return any(changed[0] ^ low == 1 << neighbour for neighbour, _ in self._neighbours[low.bit_length() - 1])
+
+    def best_move(self, masks: list):
+        value = self.value(masks)
+        if value == UNKNOWN or self.is_goal(masks):
+            return None
+
+        target = (value - 1) % 3
+        occupied = 0
+        for mask in masks:
+            occupied |= mask
+
+        for k, mask in enumerate(masks):
+            rest = mask
+            while rest:
+                low = rest & -rest
+                rest ^= low
+                cell = low.bit_length() - 1
+
+                for neighbour, direction in self._neighbours[cell]:
+                    if occupied >> neighbour & 1:
+                        continue
+
+                    moved = list(masks)
+                    moved[k] = mask ^ low ^ (1 << neighbour)
+                    if self.value(moved) == target:
+                        col, row = self._cells[cell]
+                        return col, row, direction, moved
+
+        return None
+
+    def distance(self, masks: list):
+        if self.value(masks) == UNKNOWN:
+            return None
+
+        distance = 0
+        while not self.is_goal(masks):
+            masks = self.best_move(masks)[3]
+            distance += 1
+
+        return distance
+
+
+class HintTracker:
+    def __init__(self, table: DistanceTable, field):
+        self._table = table
+        self._field = field
+        self._masks = None
+        self._remaining = None
+        self._hint = None
+
+    def update(self):
+        masks = self._table.get_masks(self._field)
+        if masks is None or masks == self._masks:
+            return False
+
+        if self._masks is None or self._remaining is None or not self._table.is_move(self._masks, masks):
+            self._remaining = self._table.distance(masks)
+        else:
+            value = self._table.value(masks)
+            self._remaining = None if value == UNKNOWN else (
+                self._remaining + (value - self._table.value(self._masks) + 1) % 3 - 1)
+
+        self._masks = masks
+        move = self._table.best_move(masks) if self._remaining else None
+        self._hint = move[:3] if move is not None else None
+
+        return True
+
+    def get_remaining(self):
+        return self._remaining
+
+    def get_hint(self):
+        return self._hint
+
+
+def table_path(root: str, index: int):
+    return os.path.join(root, '%s.pzld' % index)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from src.levels import LevelPack
+
+    parser = argparse.ArgumentParser(description='Build distance-to-goal tables for every level of a pack')
+    parser.add_argument('pack')
+    parser.add_argument('output')
+    parser.add_argument('--limit', type=int, default=TABLE_LIMIT)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    pack = LevelPack(args.pack)
+
+    for index in range(len(pack)):
+        level = pack.load(index)
+        started = time.perf_counter()
+        try:
+            table = DistanceTable.build(level.get_matrix(), level.get_scheme(), args.limit)
+        except AttributeError as error:
+            print('Level %s skipped: %s' % (index, error))
+            continue
+
+        table.save(table_path(args.output, index))
+        print('Level %s: %s states in %.1fs' % (index, table.get_states(), time.perf_counter() - started))
+
+    pack.close()
@@ -1,101 +1,118 @@
 from pyglet.graphics import Batch, OrderedGroup
 from pyglet.sprite import Sprite
 from pyglet.image import ImageData
-from src.util import BLOCKED
+from pyglet.text import Label
+from pyglet import gl
+from pyglet import app
+from src.core import Field
+from src.assets import count_batch_state
 
 
-class Field:
-    def __init__(self, scheme: dict):
-        self._background = [
-            [0, 4, 7, 5, 7, 6, 0, 0],
-            [0, 1, 2, 2, 2, 2, 2, 0],
-            [0, 3, 0, 0, 0, 0, 0, 0],
-            [0, 3, 0, 0, 0, 0, 0, 0],
-            [0, 3, 0, 0, 0, 0, 0, 0],
-            [0, 3, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0]
-        ]
+class WorldGroup(OrderedGroup):
+    def __init__(self, order: int):
+        super().__init__(order)
+        self._x, self._y = 0, 0
 
-        self._matrix = [
-            [10, 10, 10, 10, 10, 10, 10],
-            [10, 23, 10, 23, 10, 22, 10],
-            [10, 0, 21, 22, 22, 21, 10],
-            [10, 0, 10, 21, 10, 0, 10],
-            [10, 21, 23, 22, 0, 23, 10],
-            [10, 22, 10, 23, 10, 21, 10],
-            [10, 10, 10, 10, 10, 10, 10]
-        ]
+    def set_view(self, x: int, y: int):
+        self._x, self._y = x, y
 
-        self._scheme = scheme
+    def get_view(self):
+        return self._x, self._y
 
-    def check_vertical_lines(self):
-        first_line, second_line, third_line = True, True, True
+    def set_state(self):
+        gl.glPushMatrix()
+        gl.glTranslatef(-self._x, self._y, 0)
 
-        for i in range(1, 6):
-            if self._matrix[i][1] != self._scheme['first_line']:
-                first_line = False
-                break
+    def unset_state(self):
+        gl.glPopMatrix()
 
-        for i in range(1, 6):
-            if self._matrix[i][3] != self._scheme['second_line']:
-                second_line = False
-                break
 
-        for i in range(1, 6):
-            if self._matrix[i][5] != self._scheme['third_line']:
-                third_line = False
-                break
+class Arena:
+    def __init__(self, canvas):
+        self._canvas = canvas
+        self._drawables = set()
 
-        return first_line and second_line and third_line
+    def add(self, drawable):
+        self._drawables.add(drawable)
 
-    def get_size(self):
-        return len(self._matrix)
+    def discard(self, drawable):
+        self._drawables.discard(drawable)
 
-    def update_field(self, col: int, row: int, tile: int):
-        if not (0 <= row < len(self._matrix) or 0 <= col < len(self._matrix[0])):
-            raise AttributeError("Tile<%s> outside matrix: col='%s', row='%s'" % (tile, col, row))
+    def release(self):
+        for drawable in list(self._drawables):
+            self._canvas.release(drawable)
 
-        self._matrix[row][col] = tile
+        self._drawables.clear()
 
-    def is_blocked(self, col: int, row: int):
-        return (self._matrix[row][col] // 10) in BLOCKED
-
-    def get_tile(self, col: int, row: int):
-        return self._matrix[row][col]
-
-    def get_background_tile(self, col: int, row: int):
-        return self._background[row][col]
+    def __len__(self):
+        return len(self._drawables)
 
 
 class Canvas:
     def __init__(self):
-        self._drawable_objects = []
+        self._drawable_objects = {}
+        self._owners = {}
+        self._arena = None
+        self._sprite_pool = {}
         self._batch = Batch()
-        self._background = OrderedGroup(0)
-        self._foreground = OrderedGroup(1)
-        self._selection_layout = OrderedGroup(2)
+        self._world = WorldGroup(0)
+        self._background = OrderedGroup(0, self._world)
+        self._foreground = OrderedGroup(1, self._world)
+        self._selection_layout = OrderedGroup(2, self._world)
         self._curtain = OrderedGroup(3)
         self._text_layout = OrderedGroup(4)
+        self._dirty = False
 
     def get_sprite(self, img: ImageData, *, x=0, y=0, background=False, group=None):
         if background:
-            sprite = Sprite(img=img, batch=self._batch, group=self._background, x=x, y=y)
-        elif group is not None:
-            sprite = Sprite(img=img, batch=self._batch, group=group, x=x, y=y)
+            group = self._background
+        elif group is None:
+            group = self._foreground
+
+        pool = self._sprite_pool.get((group, img.get_texture().id))
+        if pool:
+            sprite = pool.pop()
+            sprite.image = img
+            sprite.update(x, y)
+            sprite.visible = True
         else:
-            sprite = Sprite(img=img, batch=self._batch, group=self._foreground, x=x, y=y)
+            sprite = Sprite(img=img, batch=self._batch, group=group, x=x, y=y)
 
-        self._drawable_objects.append(sprite)
+        self._drawable_objects[sprite] = group
+        self._own(sprite, self._arena)
 
         return sprite
 
     def delete_sprite(self, sprite: Sprite):
-        try:
-            sprite.delete()
-            self._drawable_objects.remove(sprite)
-        except Exception:
+        if sprite not in self._drawable_objects:
             return
 
+        group = self._drawable_objects.pop(sprite)
+        self._disown(sprite)
+        sprite.visible = False
+        self._sprite_pool.setdefault((group, sprite.image.get_texture().id), []).append(sprite)
+
+    def clear_pool(self):
+        for pool in self._sprite_pool.values():
+            for sprite in pool:
+                sprite.delete()
+
+        self._sprite_pool.clear()
+
+    def get_pool_size(self):
+        return sum(len(pool) for pool in self._sprite_pool.values())
+
+    def get_draw_stats(self):
+        stats = count_batch_state(self._batch)
+        stats['drawables'] = len(self._drawable_objects)
+
+        return stats
+
+    def set_view(self, x: int, y: int):
+        if self._world.get_view() != (x, y):
+            self._world.set_view(x, y)
+            self._dirty = True
+
     def get_batch(self):
         return self._batch
 
@@ -110,10 +127,100 @@ class Canvas:
 
     def delete_drawable(self, objects):
         for drawable in objects:
-            self._drawable_objects.remove(drawable)
+            self._drawable_objects.pop(drawable, None)
+            self._disown(drawable)
+
+    def open_arena(self):
+        self._arena = Arena(self)
+        return self._arena
+
+    def get_arena(self):
+        return self._arena
+
+    def release(self, drawable):
+        if drawable not in self._drawable_objects:
+            return
+
+        if self._drawable_objects[drawable] is not None:
+            self.delete_sprite(drawable)
+        else:
+            self.delete_drawable([drawable])
+            drawable.delete()
+
+    def _own(self, drawable, arena):
+        self._dirty = True
+        if arena is not None:
+            arena.add(drawable)
+            self._owners[drawable] = arena
 
-    def track(self, drawable):
-        self._drawable_objects.append(drawable)
+    def _disown(self, drawable):
+        self._dirty = True
+        owner = self._owners.pop(drawable, None)
+        if owner is not None:
+            owner.discard(drawable)
+
+    def get_drawable_count(self):
+        return len(self._drawable_objects)
+
+    def track(self, drawable, persistent=False):
+        self._drawable_objects[drawable] = None
+        self._own(drawable, None if persistent else self._arena)
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def is_dirty(self):
+        return self._dirty
 
     def draw(self):
         self._batch.draw()
+        self._dirty = False
+
+
+class CanvasEventLoop(app.EventLoop):
+    def __init__(self, canvas: Canvas):
+        super().__init__()
+        self._canvas = canvas
+
+    def idle(self):
+        self.clock.call_scheduled_functions(self.clock.update_time())
+
+        if self._canvas.is_dirty():
+            for window in app.windows:
+                window.switch_to()
+                window.dispatch_event('on_draw')
+                window.flip()
+
+        return self.clock.get_sleep_time(True)
+
+
+class ProfilerOverlay:
+    def __init__(self, profiler, canvas: Canvas, interval=30):
+        self._profiler = profiler
+        self._canvas = canvas
+        self._interval = interval
+        self._frames = 0
+        self._label = Label(text='', font_size=9, x=4, y=4, width=320, multiline=True, anchor_y='bottom',
+                            color=(255, 255, 0, 255), batch=canvas.get_batch(), group=canvas.get_text_layout())
+        canvas.track(self._label, persistent=True)
+
+    def update(self):
+        self._frames += 1
+        if self._frames % self._interval:
+            return
+
+        frame = self._profiler.get_frame_stats()
+        lines = ['frame %.2f ms  p95 %.2f ms  max %.2f ms' % (frame['mean'] * 1e3, frame['p95'] * 1e3,
+                                                               frame['max'] * 1e3)]
+
+        for name, stats in sorted(self._profiler.get_section_stats().items()):
+            lines.append('%s %.3f ms  p95 %.3f ms' % (name, stats['mean'] * 1e3, stats['p95'] * 1e3))
+
+        for name, stats in sorted(self._profiler.get_counter_stats().items()):
+            lines.append('%s %d' % (name, stats['max']))
+
+        self._label.text = '\n'.join(lines)
+        self._canvas.mark_dirty()
+
+    def delete(self):
+        self._canvas.release(self._label)
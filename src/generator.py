@@ -0,0 +1,178 @@
+from multiprocessing import Pool
+from random import Random
+import time
+from src.core import EMPTY, WALL, KINDS
+from src.levels import Level, write_pack
+from src.solver import solve, SearchExhausted
+
+SEED_STRIDE = 1000003
+
+
+class LevelGenerator:
+    def __init__(self, width=7, height=7, blocks=6, scramble=60, min_inputs=0, verify_nodes=None, max_attempts=1000):
+        if min_inputs and verify_nodes is None:
+            raise AttributeError("min_inputs='%s' needs a verify_nodes budget" % min_inputs)
+
+        self._width, self._height = width, height
+        self._blocks = blocks
+        self._scramble = scramble
+        self._min_inputs = min_inputs
+        self._verify_nodes = verify_nodes
+        self._max_attempts = max_attempts
+        self._columns = [(col, KINDS[i % len(KINDS)]) for i, col in enumerate(range(1, width - 1, 2))]
+
+    def get_scheme(self):
+        return {'columns': [[col, kind] for col, kind in self._columns]}
+
+    def generate(self, seed: int):
+        rnd = Random(seed)
+        disconnected = short = exhausted = 0
+
+        for _ in range(self._max_attempts):
+            matrix = self._solved_matrix(rnd)
+            if matrix is None:
+                disconnected += 1
+                continue
+
+            self._shuffle(matrix, rnd)
+            selection = self._selection(matrix)
+            if self._min_inputs:
+                try:
+                    solution = solve(matrix, self.get_scheme(), selection, self._verify_nodes)
+                except SearchExhausted as error:
+                    if error.get_lower_bound() is None or error.get_lower_bound() < self._min_inputs:
+                        exhausted += 1
+                        continue
+                else:
+                    if solution is None or solution.get_cost() < self._min_inputs:
+                        short += 1
+                        continue
+
+            background = [[0] * self._width for _ in range(self._height)]
+            return Level(matrix, background, self.get_scheme(), selection)
+
+        raise AttributeError("No level for seed '%s' after %s attempts: %s disconnected, %s under %s inputs, "
+                             "%s over the verify budget of %s nodes" % (seed, self._max_attempts, disconnected, short,
+                                                                         self._min_inputs, exhausted,
+                                                                         self._verify_nodes))
+
+    def _solved_matrix(self, rnd: Random):
+        matrix = [[WALL] * self._width for _ in range(self._height)]
+        goal_columns = dict(self._columns)
+        spare = []
+
+        for row in range(1, self._height - 1):
+            for col in range(1, self._width - 1):
+                if col in goal_columns:
+                    matrix[row][col] = goal_columns[col]
+                else:
+                    matrix[row][col] = EMPTY
+                    spare.append((col, row))
+
+        if self._blocks >= len(spare):
+            raise AttributeError("Layout needs at least one free cell besides the goal: blocks='%s'" % self._blocks)
+
+        for col, row in rnd.sample(spare, self._blocks):
+            matrix[row][col] = WALL
+
+        return matrix if self._is_connected(matrix) else None
+
+    def _is_connected(self, matrix: list):
+        free = [(col, row) for row in range(self._height) for col in range(self._width) if matrix[row][col] != WALL]
+        seen = {free[0]}
+        pending = [free[0]]
+
+        while pending:
+            col, row = pending.pop()
+            for cell in ((col - 1, row), (col + 1, row), (col, row - 1), (col, row + 1)):
+                if cell not in seen and matrix[cell[1]][cell[0]] != WALL:
+                    seen.add(cell)
+                    pending.append(cell)
+
+        return len(seen) == len(free)
+
+    def _shuffle(self, matrix: list, rnd: Random):
+        holes = [(col, row) for row in range(self._height) for col in range(self._width) if matrix[row][col] == EMPTY]
+        last = None
+        moves = 0
+
+        while moves < self._scramble or self._is_solved(matrix):
+            i = rnd.randrange(len(holes))
+            col, row = holes[i]
+            options = [(c, r) for c, r in ((col - 1, row), (col + 1, row), (col, row - 1), (col, row + 1))
+                       if matrix[r][c] in KINDS]
+            if len(options) > 1 and last in options:
+                options.remove(last)
+
+            if not options:
+                continue
+
+            c, r = rnd.choice(options)
+            matrix[row][col], matrix[r][c] = matrix[r][c], EMPTY
+            holes[i] = (c, r)
+            last = (col, row)
+            moves += 1
+
+    def _is_solved(self, matrix: list):
+        return all(matrix[row][col] == kind for col, kind in self._columns for row in range(1, self._height - 1))
+
+    @staticmethod
+    def _selection(matrix: list):
+        for row in range(1, len(matrix) - 1):
+            for col in range(1, len(matrix[row]) - 1):
+                if matrix[row][col] in KINDS:
+                    return col, row
+
+        return 1, 1
+
+
+def _generate_range(args):
+    options, seed, start, stop = args
+    generator = LevelGenerator(**options)
+
+    return [generator.generate(seed * SEED_STRIDE + index) for index in range(start, stop)]
+
+
+def generate_levels(count: int, seed=0, workers=None, chunk=64, **options):
+    started = time.perf_counter()
+    tasks = [(options, seed, start, min(start + chunk, count)) for start in range(0, count, chunk)]
+
+    if workers == 1:
+        results = [_generate_range(task) for task in tasks]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(_generate_range, tasks)
+
+    levels = [level for result in results for level in result]
+    elapsed = time.perf_counter() - started
+
+    return levels, {'levels': len(levels), 'elapsed': elapsed,
+                    'levels_per_second': len(levels) / elapsed if elapsed > 0 else 0.0}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate a pack of solvable levels')
+    parser.add_argument('count', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--width', type=int, default=7)
+    parser.add_argument('--height', type=int, default=7)
+    parser.add_argument('--blocks', type=int, default=6)
+    parser.add_argument('--scramble', type=int, default=60)
+    parser.add_argument('--min-inputs', type=int, default=0, help='needs --verify-nodes')
+    parser.add_argument('--verify-nodes', type=int, default=None)
+    parser.add_argument('--max-attempts', type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.min_inputs and args.verify_nodes is None:
+        parser.error('--min-inputs needs a --verify-nodes budget')
+
+    generated, stats = generate_levels(args.count, args.seed, args.workers, width=args.width, height=args.height,
+                                       blocks=args.blocks, scramble=args.scramble, min_inputs=args.min_inputs,
+                                       verify_nodes=args.verify_nodes, max_attempts=args.max_attempts)
+    write_pack(args.output, generated)
+    print('Generated %s levels in %.2fs (%.1f levels/s)' % (stats['levels'], stats['elapsed'],
+                                                          stats['levels_per_second']))
@@ -0,0 +1,118 @@
+from struct import Struct
+import json
+import mmap
+from src.core import Field, FIRST_KIND, SECOND_KIND, THIRD_KIND
+
+LEVEL_MAGIC, PACK_MAGIC = b'PZL1', b'PZLP'
+PACK_VERSION = 1
+
+HEADER = Struct('<HHHHHHH')
+PACK_HEADER = Struct('<4sHI')
+INDEX_ENTRY = Struct('<QI')
+
+
+class Level:
+    def __init__(self, matrix: list, background: list, scheme: dict, selection=(1, 4)):
+        self._matrix = matrix
+        self._background = background
+        self._scheme = scheme
+        self._selection = tuple(selection)
+
+    @staticmethod
+    def default():
+        field = Field({'first_line': FIRST_KIND, 'second_line': SECOND_KIND, 'third_line': THIRD_KIND})
+        return Level.from_field(field)
+
+    @staticmethod
+    def from_field(field: Field, selection=(1, 4)):
+        return Level(field.get_matrix(), field.get_background(), field.get_scheme(), selection)
+
+    def create_field(self, field_type=Field):
+        return field_type(self._scheme, self._matrix, self._background)
+
+    def get_matrix(self):
+        return self._matrix
+
+    def get_background(self):
+        return self._background
+
+    def get_scheme(self):
+        return self._scheme
+
+    def get_selection(self):
+        return self._selection
+
+    def encode(self):
+        scheme = json.dumps(self._scheme, separators=(',', ':')).encode('utf-8')
+        header = HEADER.pack(len(self._matrix[0]), len(self._matrix), len(self._background[0]),
+                             len(self._background), self._selection[0], self._selection[1], len(scheme))
+
+        return b''.join([header, bytes(tile for row in self._matrix for tile in row),
+                         bytes(tile for row in self._background for tile in row), scheme])
+
+    @staticmethod
+    def decode(data):
+        width, height, bg_width, bg_height, col, row, scheme_size = HEADER.unpack_from(data, 0)
+        offset = HEADER.size
+        matrix = [list(data[offset + i * width:offset + (i + 1) * width]) for i in range(height)]
+        offset += width * height
+        background = [list(data[offset + i * bg_width:offset + (i + 1) * bg_width]) for i in range(bg_height)]
+        offset += bg_width * bg_height
+        scheme = json.loads(bytes(data[offset:offset + scheme_size]).decode('utf-8'))
+
+        return Level(matrix, background, scheme, (col, row))
+
+
+class LevelPack:
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count = PACK_HEADER.unpack_from(self._data, 0)
+
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self.close()
+            raise AttributeError("Unsupported level pack: '%s'" % path)
+
+    def __len__(self):
+        return self._count
+
+    def load(self, index: int):
+        if not 0 <= index < self._count:
+            raise AttributeError("Level<%s> outside pack of %s levels" % (index, self._count))
+
+        offset, size = INDEX_ENTRY.unpack_from(self._data, PACK_HEADER.size + index * INDEX_ENTRY.size)
+        return Level.decode(memoryview(self._data)[offset:offset + size])
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+
+def save_level(path: str, level: Level):
+    with open(path, 'wb') as file:
+        file.write(LEVEL_MAGIC + level.encode())
+
+
+def load_level(path: str):
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    if data[:len(LEVEL_MAGIC)] != LEVEL_MAGIC:
+        raise AttributeError("Unsupported level file: '%s'" % path)
+
+    return Level.decode(memoryview(data)[len(LEVEL_MAGIC):])
+
+
+def write_pack(path: str, levels):
+    records = [level.encode() for level in levels]
+    offset = PACK_HEADER.size + len(records) * INDEX_ENTRY.size
+
+    with open(path, 'wb') as file:
+        file.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(records)))
+
+        for record in records:
+            file.write(INDEX_ENTRY.pack(offset, len(record)))
+            offset += len(record)
+
+        for record in records:
+            file.write(record)
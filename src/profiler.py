@@ -0,0 +1,121 @@
+from collections import deque
+from time import perf_counter
+import json
+
+
+class Histogram:
+    def __init__(self, capacity=600):
+        self._samples = deque(maxlen=capacity)
+
+    def add(self, value: float):
+        self._samples.append(value)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, fraction: float):
+        if not self._samples:
+            return 0.0
+
+        ordered = sorted(self._samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def get_stats(self):
+        if not self._samples:
+            return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+
+        ordered = sorted(self._samples)
+        count = len(ordered)
+
+        return {'count': count, 'mean': sum(ordered) / count, 'p50': ordered[count // 2],
+                'p95': ordered[min(int(0.95 * count), count - 1)], 'p99': ordered[min(int(0.99 * count), count - 1)],
+                'max': ordered[-1]}
+
+
+class Profiler:
+    def __init__(self, capacity=600, trace_limit=200000):
+        self._capacity = capacity
+        self._origin = perf_counter()
+        self._frames = Histogram(capacity)
+        self._sections = {}
+        self._counters = {}
+        self._samples = {}
+        self._events = deque(maxlen=trace_limit)
+        self._patched = []
+        self._last_frame = None
+
+    def instrument(self, owner, attr: str, name=None, frame=False):
+        original = owner.__dict__.get(attr)
+        method = getattr(owner, attr)
+        name = name if name is not None else '%s.%s' % (owner.__name__, attr)
+        histogram = self._sections.setdefault(name, Histogram(self._capacity))
+        events = self._events
+        origin = self._origin
+
+        def timed(*args, **kwargs):
+            if frame:
+                self.mark_frame()
+
+            started = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - started
+                histogram.add(elapsed)
+                events.append((name, started - origin, elapsed))
+
+        self._patched.append((owner, attr, original))
+        setattr(owner, attr, timed)
+
+    def disable(self):
+        for owner, attr, original in reversed(self._patched):
+            if original is None:
+                delattr(owner, attr)
+            else:
+                setattr(owner, attr, original)
+
+        self._patched.clear()
+        self._last_frame = None
+
+    def is_enabled(self):
+        return bool(self._patched)
+
+    def add_counter(self, name: str, sample):
+        self._counters[name] = sample
+        self._samples[name] = Histogram(self._capacity)
+
+    def mark_frame(self):
+        now = perf_counter()
+        if self._last_frame is not None:
+            self._frames.add(now - self._last_frame)
+        self._last_frame = now
+
+        for name, sample in self._counters.items():
+            value = sample()
+            self._samples[name].add(value)
+            self._events.append((name, now - self._origin, None, value))
+
+    def get_frame_stats(self):
+        return self._frames.get_stats()
+
+    def get_section_stats(self):
+        return {name: histogram.get_stats() for name, histogram in self._sections.items()}
+
+    def get_counter_stats(self):
+        return {name: histogram.get_stats() for name, histogram in self._samples.items()}
+
+    def get_trace(self):
+        trace = []
+        for event in self._events:
+            if len(event) == 3:
+                name, started, elapsed = event
+                trace.append({'name': name, 'ph': 'X', 'ts': started * 1e6, 'dur': elapsed * 1e6, 'pid': 1, 'tid': 1})
+            else:
+                name, started, _, value = event
+                trace.append({'name': name, 'ph': 'C', 'ts': started * 1e6, 'pid': 1, 'args': {name: value}})
+
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def export(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.get_trace(), file)
@@ -0,0 +1,173 @@
+from struct import Struct
+import time
+from src.core import SIMULATION_RATE, Field, Puzzle, Selection, Controller
+from src.levels import Level
+
+RECORD_MAGIC = b'PZLI'
+RECORD_VERSION = 2
+
+RECORD_PREFIX = Struct('<4sH')
+RECORD_HEADER = Struct('<4sHHIIIHHdd')
+EVENT = Struct('<IBI')
+
+PRESS, RELEASE = 0, 1
+
+
+class InputRecorder:
+    def __init__(self, level=0, rate=SIMULATION_RATE, repeat_delay=0.0, repeat_interval=0.0):
+        self._rate = rate
+        self._repeat = (repeat_delay, repeat_interval)
+        self.reset(level)
+
+    def reset(self, level: int):
+        self._level = level
+        self._ticks = 0
+        self._events = []
+        self._tiles = None
+        self._size = (0, 0)
+
+    def tick(self):
+        if self._tiles is None:
+            self._ticks += 1
+
+    def record(self, event: int, symbol: int):
+        if self._tiles is None:
+            self._events.append((self._ticks, event, symbol))
+
+    def finish(self, field):
+        if self._tiles is None:
+            matrix = field.get_matrix()
+            self._size = (len(matrix[0]), len(matrix))
+            self._tiles = bytes(tile for row in matrix for tile in row)
+
+    def is_finished(self):
+        return self._tiles is not None
+
+    def get_recording(self):
+        return Recording(self._level, self._rate, self._ticks, list(self._events), self._tiles or b'', *self._size,
+                         *self._repeat)
+
+
+class Recording:
+    def __init__(self, level: int, rate: int, ticks: int, events: list, tiles=b'', width=0, height=0,
+                 repeat_delay=0.0, repeat_interval=0.0):
+        self._level = level
+        self._rate = rate
+        self._ticks = ticks
+        self._events = events
+        self._tiles = bytes(tiles)
+        self._width, self._height = width, height
+        self._repeat_delay, self._repeat_interval = repeat_delay, repeat_interval
+
+    def get_level(self):
+        return self._level
+
+    def get_rate(self):
+        return self._rate
+
+    def get_ticks(self):
+        return self._ticks
+
+    def get_events(self):
+        return self._events
+
+    def get_tiles(self):
+        return self._tiles
+
+    def get_size(self):
+        return self._width, self._height
+
+    def get_repeat(self):
+        return self._repeat_delay, self._repeat_interval
+
+    def encode(self):
+        header = RECORD_HEADER.pack(RECORD_MAGIC, RECORD_VERSION, self._rate, self._level, self._ticks,
+                                    len(self._events), self._width, self._height, self._repeat_delay,
+                                    self._repeat_interval)
+
+        return b''.join([header, b''.join(EVENT.pack(*event) for event in self._events), self._tiles])
+
+    @staticmethod
+    def decode(data):
+        magic, version = RECORD_PREFIX.unpack_from(data, 0)
+        if magic != RECORD_MAGIC:
+            raise AttributeError("Unsupported input recording")
+        elif version != RECORD_VERSION:
+            raise AttributeError("Input recording version '%s' is not supported, version '%s' queues input "
+                                 "differently and old recordings must be recorded again" % (version, RECORD_VERSION))
+
+        _, _, rate, level, ticks, count, width, height, repeat_delay, repeat_interval = RECORD_HEADER.unpack_from(
+            data, 0)
+
+        offset = RECORD_HEADER.size
+        events = [EVENT.unpack_from(data, offset + i * EVENT.size) for i in range(count)]
+        offset += count * EVENT.size
+
+        return Recording(level, rate, ticks, events, data[offset:offset + width * height], width, height,
+                         repeat_delay, repeat_interval)
+
+
+def save_recording(path: str, recording: Recording):
+    with open(path, 'wb') as file:
+        file.write(recording.encode())
+
+
+def load_recording(path: str):
+    with open(path, 'rb') as file:
+        return Recording.decode(file.read())
+
+
+def replay(recording: Recording, level: Level, field_type=Field):
+    field = level.create_field(field_type)
+    bounds = Puzzle.get_bounds(field)
+    controller = Controller(Puzzle(field, selection=Selection(*level.get_selection(), bounds)), *recording.get_repeat())
+    events = recording.get_events()
+    dt = 1 / recording.get_rate()
+    index = 0
+
+    started = time.perf_counter()
+    for tick in range(recording.get_ticks()):
+        while index < len(events) and events[index][0] <= tick:
+            _, event, symbol = events[index]
+            if event == PRESS:
+                controller.on_key_press(symbol)
+            else:
+                controller.on_key_release(symbol)
+            index += 1
+
+        controller.update(dt)
+
+    elapsed = time.perf_counter() - started
+    tiles = bytes(tile for row in field.get_matrix() for tile in row)
+
+    return field, {'ticks': recording.get_ticks(), 'events': len(events), 'elapsed': elapsed,
+                   'ticks_per_second': recording.get_ticks() / elapsed if elapsed > 0 else 0.0,
+                   'solved': controller.get_puzzle().is_solved(),
+                   'verified': tiles == recording.get_tiles() if recording.get_tiles() else None}
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from src.levels import LevelPack
+
+    parser = argparse.ArgumentParser(description='Replay input recordings headlessly and verify the final field')
+    parser.add_argument('recordings', nargs='+')
+    parser.add_argument('--pack', default=None)
+    args = parser.parse_args()
+
+    pack = LevelPack(args.pack) if args.pack is not None else None
+    failures = 0
+
+    for path in args.recordings:
+        recording = load_recording(path)
+        level = pack.load(recording.get_level()) if pack is not None else Level.default()
+        _, stats = replay(recording, level)
+        failures += stats['verified'] is False
+        print('%s: %s ticks, %s events, %.0f ticks/s, solved=%s, verified=%s' % (
+            path, stats['ticks'], stats['events'], stats['ticks_per_second'], stats['solved'], stats['verified']))
+
+    if pack is not None:
+        pack.close()
+
+    sys.exit(1 if failures else 0)
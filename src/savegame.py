@@ -0,0 +1,108 @@
+import os
+from struct import Struct, error as StructError
+from src.core import EMPTY, History
+from src.levels import Level
+
+SAVE_MAGIC = b'PZLS'
+SAVE_VERSION = 1
+
+SAVE_HEADER = Struct('<4sHIII')
+MOTION = Struct('<HHddddB')
+PIECE = Struct('<B')
+
+
+class Snapshot:
+    def __init__(self, level_index: int, level: Level, selection: tuple, kind=EMPTY, piece=None, history=b''):
+        self._level_index = level_index
+        self._level = level
+        self._selection = selection
+        self._kind = kind
+        self._piece = piece
+        self._history = bytes(history)
+
+    @staticmethod
+    def capture(level_index: int, puzzle):
+        field = puzzle.get_field()
+        selection = puzzle.get_selection()
+        piece = selection.get_current_piece()
+        motion = selection.get_motion()
+        level = Level(field.get_matrix(), field.get_background(), field.get_scheme(), motion[:2])
+
+        return Snapshot(level_index, level, motion, piece.get_kind() if piece is not None else EMPTY,
+                        piece.get_motion() if piece is not None else None, puzzle.get_history().encode())
+
+    def get_level_index(self):
+        return self._level_index
+
+    def get_level(self):
+        return self._level
+
+    def get_selection(self):
+        return self._selection
+
+    def get_kind(self):
+        return self._kind
+
+    def get_piece(self):
+        return self._piece
+
+    def get_history(self):
+        return self._history
+
+    def encode(self):
+        level = self._level.encode()
+        piece = MOTION.pack(*self._piece) if self._piece is not None else b''
+
+        return b''.join([SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, self._level_index, len(level), len(self._history)),
+                         level, MOTION.pack(*self._selection), PIECE.pack(self._kind), piece, self._history])
+
+    @staticmethod
+    def decode(data):
+        try:
+            magic, version, level_index, level_size, history_size = SAVE_HEADER.unpack_from(data, 0)
+            if magic != SAVE_MAGIC or version != SAVE_VERSION:
+                raise AttributeError("Unsupported save file")
+
+            offset = SAVE_HEADER.size
+            level = Level.decode(memoryview(data)[offset:offset + level_size])
+            offset += level_size
+            selection = MOTION.unpack_from(data, offset)
+            offset += MOTION.size
+            kind = PIECE.unpack_from(data, offset)[0]
+            offset += PIECE.size
+            piece = None
+            if kind != EMPTY:
+                piece = MOTION.unpack_from(data, offset)
+                offset += MOTION.size
+        except (StructError, ValueError) as error:
+            raise AttributeError("Corrupt save file: %s" % error)
+
+        snapshot = Snapshot(level_index, level, selection, kind, piece, data[offset:offset + history_size])
+        snapshot.validate()
+
+        return snapshot
+
+    def validate(self):
+        matrix = self._level.get_matrix()
+        if not matrix or any(len(row) != len(matrix[0]) for row in matrix):
+            raise AttributeError("Corrupt save file: level matrix is not rectangular")
+
+        for col, row in [self._selection[:2]] + ([self._piece[:2]] if self._piece is not None else []):
+            if not (0 <= row < len(matrix) and 0 <= col < len(matrix[0])):
+                raise AttributeError("Saved cell col='%s', row='%s' outside the field" % (col, row))
+
+        if self._piece is not None and matrix[self._piece[1]][self._piece[0]] != self._kind:
+            raise AttributeError("Saved piece col='%s', row='%s' does not match the field" % self._piece[:2])
+
+        History().decode(self._history)
+
+
+def save_game(path: str, snapshot: Snapshot):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(snapshot.encode())
+
+
+def load_game(path: str):
+    with open(path, 'rb') as file:
+        return Snapshot.decode(file.read())
@@ -0,0 +1,263 @@
+from struct import Struct
+import asyncio
+from src.core import SIMULATION_RATE, LATENCY_SAMPLES, Puzzle, Selection, Controller
+from src.profiler import Histogram
+from src.bitboard import BitboardField
+from src.levels import Level
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PARKED = Struct('<HHB')
+
+
+class Session:
+    def __init__(self, session_id: int, level_index: int, level: Level, latency=None):
+        self._id = session_id
+        self._level_index = level_index
+        self._level = level
+        self._latency = latency
+        self._controller = None
+        self._parked = None
+        self._last_input = 0.0
+
+    def get_id(self):
+        return self._id
+
+    def get_level_index(self):
+        return self._level_index
+
+    def is_parked(self):
+        return self._controller is None
+
+    def get_last_input(self):
+        return self._last_input
+
+    def get_puzzle(self):
+        return self.hydrate().get_puzzle()
+
+    def hydrate(self):
+        if self._controller is not None:
+            return self._controller
+
+        level = self._level
+        if self._parked is None:
+            field = level.create_field(BitboardField)
+            selection = level.get_selection()
+        else:
+            width = len(level.get_matrix()[0])
+            col, row, active = PARKED.unpack_from(self._parked, 0)
+            selection = col, row
+            tiles = self._parked[PARKED.size:PARKED.size + width * len(level.get_matrix())]
+            matrix = [list(tiles[row:row + width]) for row in range(0, len(tiles), width)]
+            field = Level(matrix, level.get_background(), level.get_scheme()).create_field(BitboardField)
+
+        puzzle = Puzzle(field, selection=Selection(*selection, Puzzle.get_bounds(field)))
+        if self._parked is not None:
+            puzzle.get_history().decode(self._parked[PARKED.size + len(field.key()):])
+            if active:
+                puzzle.toggle()
+
+        self._controller = Controller(puzzle, latency=self._latency)
+        self._parked = None
+
+        return self._controller
+
+    def park(self):
+        if self._controller is None or not self._controller.is_idle():
+            return False
+
+        puzzle = self._controller.get_puzzle()
+        selection = puzzle.get_selection()
+        focus = selection.get_focus()
+
+        self._parked = (PARKED.pack(focus.get_col(), focus.get_row(), selection.is_active()) +
+                        puzzle.get_field().key() + puzzle.get_history().encode())
+        self._controller = None
+
+        return True
+
+    def on_key_press(self, symbol: int, now: float):
+        self._last_input = now
+        self.hydrate().on_key_press(symbol)
+
+    def on_key_release(self, symbol: int, now: float):
+        self._last_input = now
+        self.hydrate().on_key_release(symbol)
+
+    def update(self, dt):
+        self._controller.update(dt)
+
+    def is_idle(self):
+        return self._controller is None or self._controller.is_idle()
+
+    def describe(self):
+        puzzle = self.get_puzzle()
+        selection = puzzle.get_selection()
+        focus = selection.get_current_piece() if selection.is_active() else selection
+
+        return '%s %s %s %s %s %s' % (self._id, int(puzzle.is_solved()), int(selection.is_active()), focus.get_col(),
+                                      focus.get_row(), puzzle.get_field().key().hex())
+
+
+class GameServer:
+    def __init__(self, levels=None, rate=SIMULATION_RATE, park_after=5.0, max_steps=8):
+        self._levels = levels
+        self._cache = {}
+        self._sessions = {}
+        self._active = set()
+        self._next_id = 1
+        self._step = 1 / rate
+        self._park_after = park_after
+        self._max_steps = max_steps
+        self._ticks = 0
+        self._latency = Histogram(LATENCY_SAMPLES)
+
+    def get_level(self, index: int):
+        level = self._cache.get(index)
+        if level is None:
+            level = Level.default() if self._levels is None else self._levels.load(index % len(self._levels))
+            self._cache[index] = level
+
+        return level
+
+    def create_session(self, level_index=0):
+        session = Session(self._next_id, level_index, self.get_level(level_index), self._latency)
+        self._sessions[session.get_id()] = session
+        self._next_id += 1
+
+        return session
+
+    def get_session(self, session_id: int):
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise AttributeError("Unknown session '%s'" % session_id)
+
+        return session
+
+    def close_session(self, session_id: int):
+        session = self.get_session(session_id)
+        self._active.discard(session)
+        del self._sessions[session_id]
+
+    def press(self, session_id: int, symbol: int, now: float):
+        session = self.get_session(session_id)
+        session.on_key_press(symbol, now)
+        self._active.add(session)
+
+    def release(self, session_id: int, symbol: int, now: float):
+        session = self.get_session(session_id)
+        session.on_key_release(symbol, now)
+        self._active.add(session)
+
+    def tick(self, steps: int):
+        for session in list(self._active):
+            for _ in range(steps):
+                session.update(self._step)
+
+            if session.is_idle():
+                self._active.discard(session)
+
+        self._ticks += steps
+
+    def park_idle(self, now: float):
+        parked = 0
+        for session in self._sessions.values():
+            if (not session.is_parked() and session not in self._active and
+                    now - session.get_last_input() > self._park_after and session.park()):
+                parked += 1
+
+        return parked
+
+    def get_stats(self):
+        hydrated = sum(not session.is_parked() for session in self._sessions.values())
+        latency = self._latency.get_stats()
+
+        return {'sessions': len(self._sessions), 'active': len(self._active), 'hydrated': hydrated,
+                'ticks': self._ticks, 'latency_p50_ms': round(latency['p50'] * 1e3, 3),
+                'latency_p95_ms': round(latency['p95'] * 1e3, 3),
+                'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None}
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        last = last_park = loop.time()
+        backlog = 0.0
+
+        while True:
+            await asyncio.sleep(self._step)
+            now = loop.time()
+            backlog = min(backlog + now - last, self._max_steps * self._step)
+            last = now
+            steps = int(backlog / self._step + 1e-9)
+            backlog -= steps * self._step
+
+            if steps:
+                self.tick(steps)
+
+            if now - last_park > 1.0:
+                self.park_idle(now)
+                last_park = now
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+
+            try:
+                writer.write((self.execute(line.decode('ascii').split(), loop.time()) + '\n').encode('ascii'))
+            except (AttributeError, ValueError, IndexError) as error:
+                writer.write(('ERROR %s\n' % error).encode('ascii'))
+
+            await writer.drain()
+
+        writer.close()
+
+    def execute(self, words: list, now: float):
+        command = words[0].upper()
+
+        if command == 'NEW':
+            return 'OK %s' % self.create_session(int(words[1]) if len(words) > 1 else 0).get_id()
+        elif command == 'PRESS':
+            self.press(int(words[1]), int(words[2]), now)
+        elif command == 'RELEASE':
+            self.release(int(words[1]), int(words[2]), now)
+        elif command == 'STATE':
+            return 'STATE %s' % self.get_session(int(words[1])).describe()
+        elif command == 'CLOSE':
+            self.close_session(int(words[1]))
+        elif command == 'STATS':
+            return 'STATS %s' % ' '.join('%s=%s' % item for item in sorted(self.get_stats().items()))
+        else:
+            raise AttributeError("Unknown command '%s'" % command)
+
+        return 'OK'
+
+    async def serve(self, host='127.0.0.1', port=7700):
+        server = await asyncio.start_server(self.handle, host, port)
+        ticker = asyncio.ensure_future(self.run())
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            ticker.cancel()
+
+
+if __name__ == '__main__':
+    import argparse
+    from src.levels import LevelPack
+
+    parser = argparse.ArgumentParser(description='Host headless puzzle sessions over a line-based socket protocol')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7700)
+    parser.add_argument('--pack', default=None)
+    parser.add_argument('--park-after', type=float, default=5.0)
+    args = parser.parse_args()
+
+    game_server = GameServer(LevelPack(args.pack) if args.pack is not None else None, park_after=args.park_after)
+    asyncio.run(game_server.serve(args.host, args.port))
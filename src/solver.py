@@ -0,0 +1,380 @@
+from collections import deque
+from math import comb
+import heapq
+import time
+from src.core import Field, Goal, BLOCKED, KINDS, LEFT, RIGHT, UP, DOWN
+
+SELECT, DROP = 'select', 'drop'
+DIRECTIONS = {LEFT: (-1, 0), RIGHT: (1, 0), UP: (0, -1), DOWN: (0, 1)}
+PATTERN_LIMIT = 250000
+CLI_MAX_NODES = 200000
+
+
+class SearchExhausted(AttributeError):
+    def __init__(self, expanded: int, elapsed: float, lower_bound=None):
+        super().__init__("Search budget exhausted after %s expanded nodes" % expanded)
+        self._expanded = expanded
+        self._elapsed = elapsed
+        self._lower_bound = lower_bound
+
+    def get_lower_bound(self):
+        return self._lower_bound
+
+    def get_expanded(self):
+        return self._expanded
+
+    def get_elapsed(self):
+        return self._elapsed
+
+
+class Solution:
+    def __init__(self, moves: list, selection: tuple, cost: int, expanded: int, elapsed: float, weight=1):
+        self._moves = moves
+        self._selection = selection
+        self._cost = cost
+        self._expanded = expanded
+        self._elapsed = elapsed
+        self._weight = weight
+
+    def get_moves(self):
+        return self._moves
+
+    def get_cost(self):
+        return self._cost
+
+    def get_move_count(self):
+        return len(self._moves)
+
+    def get_weight(self):
+        return self._weight
+
+    def is_optimal(self):
+        return self._weight <= 1
+
+    def get_expanded(self):
+        return self._expanded
+
+    def get_elapsed(self):
+        return self._elapsed
+
+    def get_actions(self):
+        actions = []
+        col, row = self._selection
+        current = None
+
+        for piece_col, piece_row, direction in self._moves:
+            if current != (piece_col, piece_row):
+                if current is not None:
+                    actions.append(DROP)
+                    col, row = current
+
+                actions.extend([RIGHT if piece_col > col else LEFT] * abs(piece_col - col))
+                actions.extend([DOWN if piece_row > row else UP] * abs(piece_row - row))
+                actions.append(SELECT)
+
+            dc, dr = DIRECTIONS[direction]
+            actions.append(direction)
+            current = (piece_col + dc, piece_row + dr)
+
+        if current is not None:
+            actions.append(DROP)
+
+        return actions
+
+
+class Layout:
+    def __init__(self, matrix: list, goal: Goal):
+        self._cells = []
+        self._index = {}
+
+        for row in range(len(matrix)):
+            for col in range(len(matrix[row])):
+                if matrix[row][col] in KINDS or matrix[row][col] // 10 not in BLOCKED:
+                    self._index[(col, row)] = len(self._cells)
+                    self._cells.append((col, row))
+
+        self._size = len(self._cells)
+        self._neighbours = []
+        for col, row in self._cells:
+            self._neighbours.append([(self._index[(col + dc, row + dr)], direction)
+                                     for direction, (dc, dr) in DIRECTIONS.items()
+                                     if (col + dc, row + dr) in self._index])
+
+        self._masks = [0] * len(KINDS)
+        for i, (col, row) in enumerate(self._cells):
+            tile = matrix[row][col]
+            if tile in KINDS:
+                self._masks[KINDS.index(tile)] |= 1 << i
+
+        self._goals = [0] * len(KINDS)
+        self._conflicting = False
+        for cells, kind in goal.get_rules():
+            for col, row in cells:
+                if (col, row) not in self._index:
+                    raise AttributeError("Goal cell col='%s', row='%s' is blocked" % (col, row))
+
+                self._goals[KINDS.index(kind)] |= 1 << self._index[(col, row)]
+
+        for k, mask in enumerate(self._goals):
+            if any(mask & other for other in self._goals[k + 1:]):
+                self._conflicting = True
+
+    def get_size(self):
+        return self._size
+
+    def get_cell(self, index: int):
+        return self._cells[index]
+
+    def get_neighbours(self, index: int):
+        return self._neighbours[index]
+
+    def encode(self, masks: list):
+        state = 0
+        for k, mask in enumerate(masks):
+            state |= mask << (k * self._size)
+
+        return state
+
+    def decode(self, state: int):
+        full = (1 << self._size) - 1
+        return [(state >> (k * self._size)) & full for k in range(len(KINDS))]
+
+    def get_start(self):
+        return self.encode(self._masks)
+
+    def get_goal_masks(self):
+        return self._goals
+
+    def is_goal(self, state: int):
+        return all(mask & goal == goal for mask, goal in zip(self.decode(state), self._goals))
+
+    def is_feasible(self):
+        return not self._conflicting and all(bin(goal).count('1') <= bin(mask).count('1') for mask, goal in zip(self._masks, self._goals))
+
+    def distances(self, sources: list):
+        distance = [None] * self._size
+        queue = deque(sources)
+        for source in sources:
+            distance[source] = 0
+
+        while queue:
+            cell = queue.popleft()
+            for neighbour, _ in self._neighbours[cell]:
+                if distance[neighbour] is None:
+                    distance[neighbour] = distance[cell] + 1
+                    queue.append(neighbour)
+
+        return distance
+
+
+class KindHeuristic:
+    def __init__(self, layout: Layout, mask: int, goal: int):
+        self._table = None
+        self._distance = None
+        count = bin(mask).count('1')
+
+        if goal == 0:
+            return
+
+        if comb(layout.get_size(), count) <= PATTERN_LIMIT:
+            self._table = self._pattern_table(layout, count, goal)
+        else:
+            sources = [i for i in range(layout.get_size()) if goal >> i & 1]
+            self._distance = [d if d is not None else layout.get_size() for d in layout.distances(sources)]
+
+    @staticmethod
+    def _pattern_table(layout: Layout, count: int, goal: int):
+        free = [i for i in range(layout.get_size()) if not goal >> i & 1]
+        extra = count - bin(goal).count('1')
+        queue = deque()
+        table = {}
+
+        for mask in _combinations(free, extra, goal):
+            table[mask] = 0
+            queue.append(mask)
+
+        while queue:
+            mask = queue.popleft()
+            cost = table[mask] + 1
+            rest = mask
+
+            while rest:
+                low = rest & -rest
+                rest ^= low
+
+                for neighbour, _ in layout.get_neighbours(low.bit_length() - 1):
+                    if mask >> neighbour & 1:
+                        continue
+
+                    moved = mask ^ low ^ (1 << neighbour)
+                    if moved not in table:
+                        table[moved] = cost
+                        queue.append(moved)
+
+        return table
+
+    def estimate(self, mask: int):
+        if self._table is not None:
+            return self._table.get(mask)
+
+        if self._distance is None:
+            return 0
+
+        total, rest = 0, mask
+        while rest:
+            low = rest & -rest
+            rest ^= low
+            total += self._distance[low.bit_length() - 1]
+
+        return total
+
+
+def _combinations(cells: list, count: int, base: int):
+    if count == 0:
+        yield base
+        return
+
+    for i in range(len(cells) - count + 1):
+        yield from _combinations(cells[i + 1:], count - 1, base | (1 << cells[i]))
+
+
+def solve(matrix: list, scheme: dict, selection=(1, 4), max_nodes=None, weight=1, goal=None):
+    started = time.perf_counter()
+    if goal is None:
+        goal = Goal.from_scheme(scheme, len(matrix[0]), len(matrix))
+
+    layout = Layout(matrix, goal)
+
+    if not layout.is_feasible():
+        return None
+
+    size = layout.get_size()
+    goals = layout.get_goal_masks()
+    heuristics = [KindHeuristic(layout, mask, goal) for mask, goal in zip(layout.decode(layout.get_start()), goals)]
+    start = layout.get_start()
+    estimate = 0
+    for heuristic, mask in zip(heuristics, layout.decode(start)):
+        part = heuristic.estimate(mask)
+        if part is None:
+            return None
+
+        estimate += part
+
+    cells = [layout.get_cell(i) for i in range(size)]
+    travel = [[abs(col - other_col) + abs(row - other_row) for other_col, other_row in cells] + [
+        abs(col - selection[0]) + abs(row - selection[1])] for col, row in cells]
+    bits = size.bit_length()
+    held_mask = (1 << bits) - 1
+    missing = sum(bin(goal & ~mask).count('1') for mask, goal in zip(layout.decode(start), goals))
+    node = start << bits | size
+
+    best = {node: 0}
+    parents = {node: None}
+    queue = [(weight * (estimate + max(3 * missing - 1, 0)), 0, estimate, missing, node)]
+    expanded = 0
+
+    while queue:
+        priority, cost, estimate, missing, node = heapq.heappop(queue)
+        cost = -cost
+
+        if best[node] < cost:
+            continue
+
+        state, held = node >> bits, node & held_mask
+        if layout.is_goal(state):
+            return Solution(_moves(layout, parents, node, bits), selection, cost, expanded,
+                            time.perf_counter() - started, weight)
+
+        if max_nodes is not None and expanded >= max_nodes:
+            raise SearchExhausted(expanded, time.perf_counter() - started, priority if weight == 1 else None)
+
+        expanded += 1
+        masks = layout.decode(state)
+        occupied = 0
+        for mask in masks:
+            occupied |= mask
+
+        for k, mask in enumerate(masks):
+            shift = k * size
+            goal = goals[k]
+            part = heuristics[k].estimate(mask)
+            rest = mask
+
+            while rest:
+                low = rest & -rest
+                rest ^= low
+                cell = low.bit_length() - 1
+                step = cost + (1 if cell == held else travel[cell][held] + 3)
+                left = missing + (goal >> cell & 1)
+
+                for neighbour, _ in layout.get_neighbours(cell):
+                    if occupied >> neighbour & 1:
+                        continue
+
+                    moved = mask ^ low ^ (1 << neighbour)
+                    moved_part = heuristics[k].estimate(moved)
+                    if moved_part is None:
+                        continue
+
+                    child = (state ^ ((low | (1 << neighbour)) << shift)) << bits | neighbour
+                    if step < best.get(child, step + 1):
+                        best[child] = step
+                        parents[child] = node
+                        child_estimate = estimate - part + moved_part
+                        child_missing = left - (goal >> neighbour & 1)
+                        heapq.heappush(queue, (step + weight * (child_estimate + 3 * max(child_missing - 1, 0)),
+                                               -step, child_estimate, child_missing, child))
+
+    return None
+
+
+def solve_field(field: Field, selection=(1, 4), max_nodes=None, weight=1):
+    return solve(field.get_matrix(), field.get_scheme(), selection, max_nodes, weight, field.get_goal())
+
+
+def _moves(layout: Layout, parents: dict, node: int, bits: int):
+    moves = []
+    size = layout.get_size()
+
+    while parents[node] is not None:
+        parent = parents[node]
+        changed = (parent ^ node) >> bits
+        k = (changed.bit_length() - 1) // size
+        cells = (changed >> (k * size)) & ((1 << size) - 1)
+        source = (parent >> (bits + k * size)) & cells
+        target = cells ^ source
+        col, row = layout.get_cell(source.bit_length() - 1)
+        target_cell = layout.get_cell(target.bit_length() - 1)
+        direction = next(d for d, (dc, dr) in DIRECTIONS.items() if (col + dc, row + dr) == target_cell)
+        moves.append((col, row, direction))
+        node = parent
+
+    moves.reverse()
+    return moves
+
+
+if __name__ == '__main__':
+    import argparse
+    from src.core import FIRST_KIND, SECOND_KIND, THIRD_KIND
+
+    parser = argparse.ArgumentParser(description='Solve the default level. The cost counts every input: cursor '
+                                                 'steps, select, piece moves and drop.')
+    parser.add_argument('weight', type=float, nargs='?', default=1,
+                        help='heuristic weight, above 1 trades optimality for speed')
+    parser.add_argument('--max-nodes', type=int, default=CLI_MAX_NODES, help='0 searches without a budget')
+    args = parser.parse_args()
+
+    try:
+        solution = solve_field(Field({'first_line': FIRST_KIND, 'second_line': SECOND_KIND,
+                                      'third_line': THIRD_KIND}), max_nodes=args.max_nodes or None, weight=args.weight)
+    except SearchExhausted as error:
+        bound = '' if error.get_lower_bound() is None else ', at least %s inputs' % error.get_lower_bound()
+        print('%s in %.3fs%s, retry with a larger --max-nodes or a weight above 1' % (error, error.get_elapsed(),
+                                                                                      bound))
+    else:
+        if solution is None:
+            print('No solution')
+        else:
+            print('Inputs: %s (%s), piece moves: %s, expanded: %s, time: %.3fs' % (
+                solution.get_cost(), 'optimal' if solution.is_optimal() else 'bounded by weight %s' % args.weight,
+                solution.get_move_count(), solution.get_expanded(), solution.get_elapsed()))
@@ -2,9 +2,20 @@ from pyglet.shapes import Rectangle
 from pyglet.window import key
 from pyglet.text import Label
 from src.util import window_width, window_height, offset_x, offset_y, get_py_y_value
-from src.util import GROUND, BLOCK, FIRST_KIND, SECOND_KIND, THIRD_KIND
+from src.util import CURTAIN_RATE, CURTAIN_DELAY, BLINK_TIME, KEY_REPEAT_DELAY, KEY_REPEAT_INTERVAL
+from src.util import ASSETS, DISTANCES_PATH, SAVE_PATH, ground
+from src.core import Puzzle, Controller, KEY_HINT, LATENCY_SAMPLES
 from src.foundation import PieceFactory, Selection
+from src.savegame import Snapshot, save_game, load_game
 from src.environment import Field, Canvas
+from src.levels import Level
+from src.camera import Camera
+from src.replay import InputRecorder, PRESS, RELEASE
+from src.distances import DistanceTable, HintTracker, table_path
+from src.tween import TweenEngine, EASE_IN, EASE_OUT
+from src.profiler import Histogram
+from concurrent.futures import ThreadPoolExecutor
+import os
 
 
 class PuzzleFactory:
@@ -12,65 +23,224 @@ class PuzzleFactory:
         self._field = field
         self._canvas = canvas
         self._field_size = field.get_size()
+        self._field_width = field.get_width()
+        self._tiles = {}
+        self._shown_pieces = set()
+        self._bounds = None
 
     def create_pieces(self) -> list:
-        pieces = []
-        for i in range(1, self._field_size - 1):
-            for j in range(1, self._field_size - 1):
-                kind = self._field.get_tile(j, i)
+        return Puzzle.create_pieces(
+            self._field, lambda field, kind, col, row: PieceFactory.new_instance(field, kind, col, row, self._canvas))
 
-                if kind not in [FIRST_KIND, SECOND_KIND, THIRD_KIND]:
-                    continue
+    def build_environment(self, bounds=None, occupancy=None):
+        if bounds is None:
+            bounds = (0, 0, self._field_width - 1, self._field_size - 1)
 
-                pieces.append(
-                    PieceFactory.new_instance(self._field, self._field.get_tile(j, i), j, i, self._canvas))
+        self.stream(bounds, occupancy)
 
-        return pieces
+    def stream(self, bounds: tuple, occupancy=None):
+        if bounds == self._bounds:
+            return
+
+        self._bounds = bounds
+        left, top, right, bottom = bounds
+
+        for cell in [cell for cell in self._tiles if not (left <= cell[0] <= right and top <= cell[1] <= bottom)]:
+            for sprite in self._tiles.pop(cell):
+                self._canvas.delete_sprite(sprite)
+
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                if (col, row) not in self._tiles:
+                    self._tiles[(col, row)] = self._create_tile(col, row)
+
+        if occupancy is None:
+            return
+
+        for piece in [piece for piece in self._shown_pieces if not piece.is_selected() and not (
+                left <= piece.get_col() <= right and top <= piece.get_row() <= bottom)]:
+            piece.hide()
+            self._shown_pieces.discard(piece)
+
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                piece = occupancy.get(col, row)
+                if piece is not None and piece not in self._shown_pieces:
+                    piece.show()
+                    self._shown_pieces.add(piece)
+
+    def _create_tile(self, col: int, row: int):
+        sprites = []
+        x = offset_x + col * 64
+        y = get_py_y_value(offset_y + row * 64)
 
-    def build_environment(self):
-        for i in range(1, self._field_size - 1):
-            for j in range(1, self._field_size - 1):
-                x = offset_x + j * 64
-                y = get_py_y_value(offset_y + i * 64)
-                self._canvas.get_sprite(GROUND[self._field.get_background_tile(j, i)], background=True, x=x, y=y)
+        if 1 <= col < self._field_width - 1 and 1 <= row < self._field_size - 1:
+            sprites.append(
+                self._canvas.get_sprite(ground(self._field.get_background_tile(col, row)), background=True, x=x, y=y))
 
-                if self._field.get_tile(j, i) == 10:
-                    self._canvas.get_sprite(BLOCK, x=x, y=y)
+            if self._field.get_tile(col, row) == 10:
+                sprites.append(self._canvas.get_sprite(ASSETS.get('block'), x=x, y=y))
+        elif row == 0 and 1 <= col < self._field_width - 1:
+            sprites.append(
+                self._canvas.get_sprite(ground(self._field.get_background_tile(col, 0)), background=True, x=x, y=y))
 
-        for i in range(1, self._field_size - 1):
-            x = offset_x + i * 64
-            y = get_py_y_value(offset_y)
-            self._canvas.get_sprite(GROUND[self._field.get_background_tile(i, 0)], background=True, x=x, y=y)
+        return sprites
+
+    def invalidate(self):
+        self._bounds = None
+
+    def get_sprite_count(self):
+        return sum(len(sprites) for sprites in self._tiles.values()) + len(self._shown_pieces)
 
 
 class GameStateManager:
-    def __init__(self, canvas: Canvas):
+    def __init__(self, canvas: Canvas, levels=None, level=0):
         self.intro_state = 0
         self.play_state = 1
         self.end_state = 2
         self._canvas = canvas
         self._current_state = None
+        self._levels = levels
+        self._level = level
+        self._recorder = None
+        self._tweens = TweenEngine()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+        self._resume = None
+
+    def get_level(self):
+        if self._levels is None:
+            return Level.default()
+
+        return self._levels.load(self._level)
+
+    def preload(self):
+        self._pending = self._executor.submit(PlayState.prepare, self.get_level, self.get_distances)
+
+    def get_distances(self):
+        path = table_path(DISTANCES_PATH, self._level)
+        if not os.path.exists(path):
+            return None
+
+        return DistanceTable.load(path)
+
+    def start_recording(self):
+        self._recorder = InputRecorder(self._level, repeat_delay=KEY_REPEAT_DELAY, repeat_interval=KEY_REPEAT_INTERVAL)
+
+    def stop_recording(self):
+        recorder, self._recorder = self._recorder, None
+        if recorder is not None and isinstance(self._current_state, PlayState):
+            recorder.finish(self._current_state.get_field())
+
+        return recorder
+
+    def get_recorder(self):
+        return self._recorder
+
+    def get_tweens(self):
+        return self._tweens
+
+    def save(self, path: str):
+        if not isinstance(self._current_state, PlayState):
+            return False
+
+        save_game(path, Snapshot.capture(self._level, self._current_state.get_puzzle()))
+        return True
+
+    def load(self, path: str):
+        if self._recorder is not None:
+            print("Save '%s' not loaded: loading is disabled while recording input" % path)
+            return False
+
+        try:
+            resume = load_game(path)
+        except (AttributeError, OSError) as error:
+            print("Save '%s' not loaded: %s" % (path, error))
+            return False
+
+        if self._levels is not None and resume.get_level_index() >= len(self._levels):
+            print("Save '%s' not loaded: level %s is not in the pack" % (path, resume.get_level_index()))
+            return False
+
+        self._resume = resume
+        self._level = resume.get_level_index()
+        self._pending = None
+        self.set_state(self.play_state)
+
+        return True
 
     def set_state(self, state):
+        if self._recorder is not None and isinstance(self._current_state, PlayState):
+            self._recorder.finish(self._current_state.get_field())
+
+        if state == self.play_state and self._recorder is not None:
+            self._recorder.reset(self._level)
+
+        arena = self._canvas.get_arena()
+        self._tweens.clear()
+        self._canvas.open_arena()
+
         if state == self.intro_state:
             self._current_state = IntroState(self, self._canvas)
         elif state == self.play_state:
-            self._current_state = PlayState(self, self._canvas)
+            pending, self._pending = self._pending, None
+            resume, self._resume = self._resume, None
+            if resume is not None:
+                prepared = PlayState.prepare(resume.get_level, self.get_distances)
+            elif pending is not None:
+                prepared = pending.result()
+            else:
+                prepared = PlayState.prepare(self.get_level, self.get_distances)
+
+            self._current_state = PlayState(self, self._canvas, prepared)
+            if resume is not None:
+                self._current_state.restore(resume)
         elif state == self.end_state:
             self._current_state = EndState(self, self._canvas)
 
-    def on_key_press(self, symbol):
-        self._current_state.on_key_press(symbol)
+        if arena is not None:
+            arena.release()
+
+    def is_idle(self):
+        return not len(self._tweens) and self._current_state.is_idle()
+
+    def on_key_press(self, symbol, timestamp=None):
+        if symbol == key.F5:
+            self.save(SAVE_PATH)
+            return
+        elif symbol == key.F9 and os.path.exists(SAVE_PATH):
+            self.load(SAVE_PATH)
+            return
+
+        if self._recorder is not None:
+            self._recorder.record(PRESS, symbol)
+
+        self._current_state.on_key_press(symbol, timestamp)
+
+    def on_key_release(self, symbol, timestamp=None):
+        if self._recorder is not None:
+            self._recorder.record(RELEASE, symbol)
 
-    def on_key_release(self, symbol):
-        self._current_state.on_key_release(symbol)
+        self._current_state.on_key_release(symbol, timestamp)
 
     def update(self, dt):
+        if self._recorder is not None:
+            self._recorder.tick()
+
         self._current_state.update(dt)
+        if len(self._tweens):
+            self._tweens.update(dt)
+            self._canvas.mark_dirty()
+
+    def draw(self, alpha=1.0):
+        if not self._canvas.is_dirty():
+            return False
 
-    def draw(self):
+        self._current_state.draw(alpha)
         self._canvas.draw()
 
+        return True
+
 
 class State:
     def __init__(self, gsm: GameStateManager, canvas: Canvas):
@@ -81,10 +251,16 @@ class State:
     def update(self, dt):
         pass
 
-    def on_key_press(self, symbol):
+    def draw(self, alpha: float):
+        pass
+
+    def is_idle(self):
+        return not any(self._keys.values())
+
+    def on_key_press(self, symbol, timestamp=None):
         self._keys[symbol] = True
 
-    def on_key_release(self, symbol):
+    def on_key_release(self, symbol, timestamp=None):
         if symbol not in self._keys:
             return
 
@@ -94,6 +270,7 @@ class State:
 class IntroState(State):
     def __init__(self, gsm: GameStateManager, canvas: Canvas):
         super().__init__(gsm, canvas)
+        ASSETS.get('small_pixel')
         self._title = Label(text='PUZZLE', font_name='Small Pixel', font_size=30,
                             x=window_width // 2, y=window_height // 2 + 64,
                             anchor_x='center', anchor_y='center',
@@ -106,6 +283,10 @@ class IntroState(State):
                                       x=window_width // 2, y=window_height // 2 - 32,
                                       anchor_x='center', anchor_y='center',
                                       batch=canvas.get_batch(), group=canvas.get_text_layout())
+        self._history_info = Label(text='<Z> to undo, <Y> to redo', font_name='Small Pixel', font_size=16,
+                                   x=window_width // 2, y=window_height // 2 - 64,
+                                   anchor_x='center', anchor_y='center',
+                                   batch=canvas.get_batch(), group=canvas.get_text_layout())
         self._continue_info = Label(text='Press <ENTER> to continue', font_name='Small Pixel', font_size=16,
                                     x=window_width // 2, y=window_height // 2 - 128,
                                     anchor_x='center', anchor_y='center',
@@ -115,45 +296,46 @@ class IntroState(State):
         canvas.track(self._title)
         canvas.track(self._movement_info_1)
         canvas.track(self._movement_info_2)
+        canvas.track(self._history_info)
         canvas.track(self._continue_info)
         canvas.track(self._background)
 
-        self._ticks = 0
+        self._time = 0.0
         self._forward_animation = True
+        gsm.preload()
 
     def update(self, dt):
         if self._continue_info is None:
             return
 
         if self._forward_animation:
-            self._ticks += 1
+            self._time = min(self._time + dt, BLINK_TIME)
         else:
-            self._ticks -= 1
+            self._time = max(self._time - dt, 0.0)
 
-        self._continue_info.color = (255, 255, 255, 255 - 255 * self._ticks // 80)
+        color = (255, 255, 255, 255 - int(255 * self._time / BLINK_TIME))
+        if self._continue_info.color != color:
+            self._continue_info.color = color
+            self._canvas.mark_dirty()
 
-        if self._ticks == 80:
+        if self._time == BLINK_TIME:
             self._forward_animation = False
-        elif self._ticks == 0:
+        elif self._time == 0.0:
             self._forward_animation = True
 
-    def on_key_press(self, symbol):
+    def is_idle(self):
+        return False
+
+    def on_key_press(self, symbol, timestamp=None):
         if symbol == key.ENTER:
             self._gsm.set_state(self._gsm.play_state)
-            self._canvas.delete_drawable(
-                [self._movement_info_1, self._movement_info_2, self._title, self._continue_info])
-            self._background.delete()
-            self._title.delete()
-            self._movement_info_1.delete()
-            self._movement_info_2.delete()
-            self._continue_info.delete()
 
 
 class PlayState(State):
-    def __init__(self, gsm: GameStateManager, canvas: Canvas):
+    def __init__(self, gsm: GameStateManager, canvas: Canvas, prepared=None):
         super().__init__(gsm, canvas)
-        self._event_tick = 0
-        self._start_event, self._end_event = True, False
+        self._event_time = 0.0
+        self._end_event, self._closing = False, False
         self._rectangles = []
 
         for i in range(9):
@@ -162,81 +344,164 @@ class PlayState(State):
                           group=canvas.get_curtain(), color=(0, 0, 0)))
             canvas.track(self._rectangles[-1])
 
-        self._field = Field({'first_line': FIRST_KIND, 'second_line': SECOND_KIND, 'third_line': THIRD_KIND})
+        self.open_curtain()
+        if prepared is None:
+            prepared = PlayState.prepare(gsm.get_level, gsm.get_distances)
+
+        level, self._field, table = prepared
         self._factory = PuzzleFactory(self._field, self._canvas)
         self._pieces = self._factory.create_pieces()
-        self._factory.build_environment()
-        self._selection = Selection(1, 4, self._canvas)
+        self._selection = Selection(*level.get_selection(), self._canvas, Puzzle.get_bounds(self._field))
+        self._puzzle = Puzzle(self._field, self._pieces, self._selection)
+        self._controller = Controller(self._puzzle, KEY_REPEAT_DELAY, KEY_REPEAT_INTERVAL,
+                                      Histogram(LATENCY_SAMPLES))
+        self._camera = Camera(window_width, window_height, self._field.get_width(), self._field.get_size())
+        self._canvas.set_view(*self._camera.center(*self._selection.get_focus_position(1.0)))
+        self._factory.build_environment(self._camera.get_tiles(), self._puzzle.get_occupancy())
+
+        self._hints = HintTracker(table, self._field) if table is not None else None
+        self._show_hint = False
+        self._hint_info = None
+        if self._hints is not None:
+            self._hint_info = Label(text='', font_name='Small Pixel', font_size=12, x=window_width // 2, y=16,
+                                    anchor_x='center', anchor_y='center',
+                                    batch=canvas.get_batch(), group=canvas.get_text_layout())
+            canvas.track(self._hint_info)
+            self.update_hint(self._hints.update())
 
     def update(self, dt):
-        if self._start_event:
-            self.start_event()
-
+        view = self.get_view()
         if self._end_event:
-            self.end_event()
+            self.end_event(dt)
+
+        if self._controller.update(dt):
+            self._factory.invalidate()
 
-        self._selection.update(dt)
+        if self._hints is not None:
+            self.update_hint(self._hints.update())
 
-        if self._field.check_vertical_lines() and not self._selection.is_active():
+        if self._puzzle.is_solved() and not self._closing:
             self._end_event = True
 
-        if self._keys[key.LEFT]:
-            self._selection.move_left()
-        elif self._keys[key.RIGHT]:
-            self._selection.move_right()
-        elif self._keys[key.UP]:
-            self._selection.move_up()
-        elif self._keys[key.DOWN]:
-            self._selection.move_down()
+        if self.get_view() != view:
+            self._canvas.mark_dirty()
 
         super().update(dt)
 
-    def on_key_press(self, symbol):
-        super().on_key_press(symbol)
+    def get_view(self):
+        focus = self._selection.get_focus()
+        return (focus.get_render_position(0.0), focus.position, self._selection.is_active(),
+                len(self._puzzle.get_history()))
 
-        if symbol == key.SPACE or symbol == key.ENTER:
-            if self._selection.is_active() and not self._selection.is_moving():
-                self._selection.drop()
-            elif not self._selection.is_moving():
-                col, row = self._selection.get_col(), self._selection.get_row()
-                result = list(filter(lambda piece: piece.get_col() == col and piece.get_row() == row, self._pieces))
+    def on_key_press(self, symbol, timestamp=None):
+        super().on_key_press(symbol, timestamp)
+        self._controller.on_key_press(symbol, timestamp)
 
-                if len(result) > 0:
-                    self._selection.select(result[0])
+        if symbol == KEY_HINT and self._hints is not None:
+            self._show_hint = not self._show_hint
+            self.update_hint(True)
 
-    def start_event(self):
-        for i in range(0, 9, 2):
-            self._rectangles[i].x -= 12
+    def update_hint(self, changed: bool):
+        if not changed:
+            return
 
-        for i in range(1, 9, 2):
-            self._rectangles[i].x += 12
+        text = ''
+        if self._hints.get_remaining() is not None:
+            text = 'MOVES LEFT %s' % self._hints.get_remaining()
+            hint = self._hints.get_hint()
+            if self._show_hint and hint is not None:
+                text += '   HINT %s,%s %s' % (hint[0], hint[1], hint[2].upper())
 
-        if self._rectangles[0].x < -window_width:
-            self._start_event = False
+        if self._hint_info.text != text:
+            self._hint_info.text = text
+            self._canvas.mark_dirty()
 
-    def end_event(self):
-        if self._event_tick > 20:
-            for i in range(0, 9, 2):
-                self._rectangles[i].x += 12
+    def on_key_release(self, symbol, timestamp=None):
+        super().on_key_release(symbol, timestamp)
+        self._controller.on_key_release(symbol, timestamp)
 
-            for i in range(1, 9, 2):
-                self._rectangles[i].x -= 12
+    def is_idle(self):
+        return super().is_idle() and not self._end_event and not self._closing and self._controller.is_idle()
 
-            if self._rectangles[0].x > 0:
-                self._end_event = False
+    def get_latency_stats(self):
+        return self._controller.get_latency().get_stats()
 
-            if self._rectangles[0].x > 0:
-                self._gsm.set_state(self._gsm.end_state)
-        else:
-            self._event_tick += 1
+    def restore(self, snapshot: Snapshot):
+        self._selection.set_motion(*snapshot.get_selection())
+
+        if snapshot.get_piece() is not None:
+            col, row = snapshot.get_piece()[:2]
+            piece = self._puzzle.piece_at(col, row)
+            if piece is None or piece.get_kind() != snapshot.get_kind():
+                raise AttributeError("Saved piece col='%s', row='%s' does not match the field" % (col, row))
+
+            piece.set_motion(*snapshot.get_piece())
+            self._selection.select(piece)
+
+        self._puzzle.get_history().decode(snapshot.get_history())
+        self._canvas.set_view(*self._camera.center(*self._selection.get_focus_position(1.0)))
+        self._factory.invalidate()
+        self._factory.stream(self._camera.get_tiles(), self._puzzle.get_occupancy())
+
+    def get_puzzle(self):
+        return self._puzzle
+
+    def get_field(self):
+        return self._field
+
+    def draw(self, alpha: float):
+        self._selection.sync(alpha)
+        self._canvas.set_view(*self._camera.follow(*self._selection.get_focus_position(alpha)))
+        self._factory.stream(self._camera.get_tiles(), self._puzzle.get_occupancy())
+
+    @staticmethod
+    def prepare(load_level, load_distances):
+        level = load_level()
+        return level, level.create_field(), load_distances()
+
+    def open_curtain(self):
+        duration = window_width / CURTAIN_RATE
+        for i, rectangle in enumerate(self._rectangles):
+            end = -window_width if i % 2 == 0 else window_width
+            self._gsm.get_tweens().add(rectangle, (0, rectangle.y), (end, rectangle.y), duration, EASE_OUT)
+
+    def close_curtain(self):
+        duration = window_width / CURTAIN_RATE
+        for i, rectangle in enumerate(self._rectangles):
+            self._gsm.get_tweens().add(rectangle, (rectangle.x, rectangle.y), (0, rectangle.y), duration, EASE_IN,
+                                       self.finish if i == 0 else None)
+
+    def end_event(self, dt):
+        self._event_time += dt
+        if self._event_time > CURTAIN_DELAY:
+            self._end_event, self._closing = False, True
+            self.close_curtain()
+
+    def finish(self):
+        self._gsm.set_state(self._gsm.end_state)
 
 
 class EndState(State):
     def __init__(self, gsm: GameStateManager, canvas: Canvas):
         super().__init__(gsm, canvas)
+        ASSETS.get('small_pixel')
         self._background = Rectangle(0, 0, width=window_width, height=window_height, batch=canvas.get_batch(),
                                      group=canvas.get_curtain(), color=(0, 0, 0))
         self._title = Label(text='THE END', font_name='Small Pixel', font_size=30,
                             x=window_width // 2, y=window_height // 2 + 64,
                             anchor_x='center', anchor_y='center',
                             batch=canvas.get_batch(), group=canvas.get_text_layout())
+        canvas.track(self._background)
+        canvas.track(self._title)
+
+
+def instrument(profiler, canvas: Canvas):
+    profiler.instrument(GameStateManager, 'update')
+    profiler.instrument(GameStateManager, 'draw', frame=True)
+    profiler.instrument(Canvas, 'draw')
+
+    for state in (IntroState, PlayState, EndState):
+        profiler.instrument(state, 'update')
+
+    profiler.instrument(TweenEngine, 'update')
+    profiler.add_counter('drawables', canvas.get_drawable_count)
@@ -0,0 +1,33 @@
+from src.core import SIMULATION_RATE
+
+
+class FixedTimestep:
+    def __init__(self, rate=SIMULATION_RATE, max_steps=8, max_backlog=0.25):
+        self._step = 1 / rate
+        self._max_steps = max_steps
+        self._max_backlog = max_backlog
+        self._accumulator = 0.0
+        self._ticks = 0
+
+    def advance(self, elapsed: float):
+        self._accumulator = min(self._accumulator + elapsed, self._max_backlog)
+        steps = min(int(self._accumulator / self._step + 1e-9), self._max_steps)
+        self._accumulator = max(self._accumulator - steps * self._step, 0.0)
+        self._ticks += steps
+
+        return steps
+
+    def reset(self):
+        self._accumulator = 0.0
+
+    def get_step(self):
+        return self._step
+
+    def get_alpha(self):
+        return min(self._accumulator / self._step, 1.0)
+
+    def get_ticks(self):
+        return self._ticks
+
+    def get_backlog(self):
+        return self._accumulator
@@ -0,0 +1,143 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+VECTOR_THRESHOLD = 64
+
+
+def _in_out_cubic(t):
+    return 4 * t * t * t if t < 0.5 else 1 - (2 - 2 * t) ** 3 / 2
+
+
+def _in_out_cubic_vector(t):
+    return numpy.where(t < 0.5, 4 * t * t * t, 1 - (2 - 2 * t) ** 3 / 2)
+
+
+LINEAR, EASE_IN, EASE_OUT, EASE_IN_OUT = 0, 1, 2, 3
+EASINGS = [
+    (lambda t: t, lambda t: t),
+    (lambda t: t * t, lambda t: t * t),
+    (lambda t: t * (2 - t), lambda t: t * (2 - t)),
+    (_in_out_cubic, _in_out_cubic_vector),
+]
+
+
+class TweenEngine:
+    def __init__(self, threshold=VECTOR_THRESHOLD):
+        self._threshold = threshold
+        self._targets = []
+        self._callbacks = []
+        self._index = {}
+        self._start_x, self._start_y = array('d'), array('d')
+        self._end_x, self._end_y = array('d'), array('d')
+        self._elapsed, self._duration = array('d'), array('d')
+        self._easing = array('B')
+
+    def add(self, target, start: tuple, end: tuple, duration: float, easing=LINEAR, on_done=None):
+        self.cancel(target)
+        self._index[target] = len(self._targets)
+        self._targets.append(target)
+        self._callbacks.append(on_done)
+        self._start_x.append(start[0])
+        self._start_y.append(start[1])
+        self._end_x.append(end[0])
+        self._end_y.append(end[1])
+        self._elapsed.append(0.0)
+        self._duration.append(max(duration, 1e-9))
+        self._easing.append(easing)
+
+    def cancel(self, target):
+        index = self._index.get(target)
+        if index is not None:
+            self._remove(index)
+
+    def clear(self):
+        self._targets.clear()
+        self._callbacks.clear()
+        self._index.clear()
+        for values in (self._start_x, self._start_y, self._end_x, self._end_y, self._elapsed, self._duration,
+                       self._easing):
+            del values[:]
+
+    def is_active(self, target):
+        return target in self._index
+
+    def __len__(self):
+        return len(self._targets)
+
+    def update(self, dt):
+        if not self._targets:
+            return
+
+        if numpy is not None and len(self._targets) >= self._threshold:
+            xs, ys, done = self._advance_vector(dt)
+            for target, x, y in zip(self._targets, xs, ys):
+                target.position = (x, y)
+        else:
+            done = self._advance(dt)
+
+        if not done:
+            return
+
+        callbacks = [self._callbacks[index] for index in done]
+        for index in sorted(done, reverse=True):
+            self._remove(index)
+
+        for callback in callbacks:
+            if callback is not None:
+                callback()
+
+    def _advance(self, dt):
+        start_x, start_y, end_x, end_y = self._start_x, self._start_y, self._end_x, self._end_y
+        elapsed, duration, easing = self._elapsed, self._duration, self._easing
+        done = []
+
+        for i, target in enumerate(self._targets):
+            current = elapsed[i] = min(elapsed[i] + dt, duration[i])
+            if current == duration[i]:
+                done.append(i)
+
+            t = EASINGS[easing[i]][0](current / duration[i])
+            target.position = (start_x[i] + (end_x[i] - start_x[i]) * t, start_y[i] + (end_y[i] - start_y[i]) * t)
+
+        return done
+
+    def _advance_vector(self, dt):
+        elapsed = numpy.frombuffer(self._elapsed, dtype=numpy.float64)
+        duration = numpy.frombuffer(self._duration, dtype=numpy.float64)
+        easing = numpy.frombuffer(self._easing, dtype=numpy.uint8)
+        numpy.minimum(elapsed + dt, duration, out=elapsed)
+
+        progress = elapsed / duration
+        t = numpy.empty_like(progress)
+        for kind in numpy.unique(easing).tolist():
+            selected = easing == kind
+            t[selected] = EASINGS[kind][1](progress[selected])
+
+        start_x = numpy.frombuffer(self._start_x, dtype=numpy.float64)
+        start_y = numpy.frombuffer(self._start_y, dtype=numpy.float64)
+        xs = start_x + (numpy.frombuffer(self._end_x, dtype=numpy.float64) - start_x) * t
+        ys = start_y + (numpy.frombuffer(self._end_y, dtype=numpy.float64) - start_y) * t
+
+        return xs.tolist(), ys.tolist(), numpy.flatnonzero(elapsed == duration).tolist()
+
+    def _remove(self, index: int):
+        last = len(self._targets) - 1
+        del self._index[self._targets[index]]
+
+        if index != last:
+            self._targets[index] = self._targets[last]
+            self._callbacks[index] = self._callbacks[last]
+            self._index[self._targets[index]] = index
+            for values in (self._start_x, self._start_y, self._end_x, self._end_y, self._elapsed, self._duration,
+                           self._easing):
+                values[index] = values[last]
+
+        self._targets.pop()
+        self._callbacks.pop()
+        for values in (self._start_x, self._start_y, self._end_x, self._end_y, self._elapsed, self._duration,
+                       self._easing):
+            values.pop()
@@ -1,11 +1,20 @@
-from pyglet.image import ImageData, load
-from pyglet.sprite import Sprite
-from pyglet import font
+from src.assets import AssetRegistry
+from src.core import offset_x, offset_y, ANIMATION_RATE, SIMULATION_RATE, BLOCKED
+from src.core import EMPTY, FIRST_KIND, SECOND_KIND, THIRD_KIND
 import sys
 import os
 
+try:
+    import platformdirs
+except ImportError:
+    platformdirs = None
+
 window_width, window_height = 576, 576
-offset_x, offset_y = 64, 64
+CURTAIN_RATE = 1440
+CURTAIN_DELAY = 1 / 6
+BLINK_TIME = 2 / 3
+KEY_REPEAT_DELAY = 0.0
+KEY_REPEAT_INTERVAL = 0.0
 
 if getattr(sys, 'frozen', False):
     application_path = os.path.dirname(sys.executable)
@@ -14,25 +23,74 @@ elif __file__:
 else:
     application_path = ""
 
-working_dir = os.path.join(application_path, 'assets\\')
+ASSETS = AssetRegistry(os.path.join(application_path, 'assets'))
+LEVELS_PATH = os.path.join(application_path, 'assets', 'levels.pack')
+DISTANCES_PATH = os.path.join(application_path, 'assets', 'distances')
+
+
+def user_data_path():
+    if platformdirs is not None:
+        return platformdirs.user_data_dir('puzzle', appauthor=False)
+
+    if sys.platform == 'win32':
+        return os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'puzzle')
+    elif sys.platform == 'darwin':
+        return os.path.join(os.path.expanduser('~'), 'Library', 'Application Support', 'puzzle')
+
+    return os.path.join(os.environ.get('XDG_DATA_HOME', os.path.join(os.path.expanduser('~'), '.local', 'share')),
+                        'puzzle')
+
+
+SAVE_PATH = os.path.join(user_data_path(), 'savegame.pzs')
+ASSETS.register_font('small_pixel', 'Small Pixel', 'small_pixel.ttf')
+for i in range(8):
+    ASSETS.register('ground_0%s' % i, 'ground_0%s.png' % i)
+
+ASSETS.register('block', 'block_03.png')
+ASSETS.register('selection', 'selection.png')
+for color in ['red', 'green', 'blue']:
+    ASSETS.register('%s_piece' % color, 'pieces', '%s_piece.png' % color)
+    ASSETS.register('%s_piece_selected' % color, 'pieces', '%s_piece_selected.png' % color)
+
+LEGACY_ASSETS = {
+    'SMALL_PIXEL': 'small_pixel', 'BLOCK': 'block', 'SELECTION': 'selection',
+    'RED_PIECE': 'red_piece', 'GREEN_PIECE': 'green_piece', 'BLUE_PIECE': 'blue_piece',
+    'RED_PIECE_SELECTED': 'red_piece_selected', 'GREEN_PIECE_SELECTED': 'green_piece_selected',
+    'BLUE_PIECE_SELECTED': 'blue_piece_selected'
+}
 
-print(working_dir)
 
-font.add_file(working_dir + 'small_pixel.ttf')
-SMALL_PIXEL = font.load('Small Pixel')
+def __getattr__(name):
+    if name == 'GROUND':
+        return [ground(i) for i in range(8)]
 
+    if name == 'ATLAS':
+        return ASSETS.get_loader()
 
-def set_center(img: ImageData):
+    if name in LEGACY_ASSETS:
+        return ASSETS.get(LEGACY_ASSETS[name])
+
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+
+
+def ground(index: int):
+    return ASSETS.get('ground_0%s' % index)
+
+
+def set_center(img):
     img.anchor_x = img.width // 2
     img.anchor_y = img.height // 2
 
 
-def rescale_sprite_64(sprite: Sprite, width, height):
+def rescale_sprite_64(sprite, width, height):
     sprite.scale_x = 64 / width
     sprite.scale_y = 64 / height
 
 
 def load_sprite(path: str, rescale=False):
+    from pyglet.image import load
+    from pyglet.sprite import Sprite
+
     img = load(path)
     sprite = Sprite(img=img)
 
@@ -42,24 +100,6 @@ def load_sprite(path: str, rescale=False):
     return sprite
 
 
-GROUND = []
-for i in range(8):
-    GROUND.append(load(working_dir + 'ground_0%s.png' % i))
-
-BLOCK = load(working_dir + 'block_03.png')
-RED_PIECE = load(working_dir + 'pieces/red_piece.png')
-GREEN_PIECE = load(working_dir + 'pieces/green_piece.png')
-BLUE_PIECE = load(working_dir + 'pieces/blue_piece.png')
-SELECTION = load(working_dir + 'selection.png')
-RED_PIECE_SELECTED = load(working_dir + 'pieces/red_piece_selected.png')
-GREEN_PIECE_SELECTED = load(working_dir + 'pieces/green_piece_selected.png')
-BLUE_PIECE_SELECTED = load(working_dir + 'pieces/blue_piece_selected.png')
-
-ANIMATION_RATE = 220
-BLOCKED = [1, 2]
-EMPTY, FIRST_KIND, SECOND_KIND, THIRD_KIND = 0, 21, 22, 23
-
-
 def get_py_y_value(my_y_value):
     return window_height - 64 - my_y_value
 